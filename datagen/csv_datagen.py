@@ -1,38 +1,61 @@
 import json
+import argparse
 import string
-import random
 import csv
+import numpy as np
 
-if __name__ == "__main__":
-    data = []
-    
-    # Number of files to generate
-    n_tickers = 100
+fieldnames = ["ticker", "time_id", "open", "close", "percentChange", "volume"]
+
+
+def generate_rows(rng, n_tickers, n_ticks, chunk_size):
     for i in range(n_tickers):
-        
+
         # Starting variables
-        cur_price = random.random() * random.randint(5, 3000)
-        reviews = random.randint(5, 1000)
-        positive_reviews = random.randint(1, reviews)
-        avg_volume = random.randint(1000, 5000000)
-        ticker = "".join(random.choices(string.ascii_letters, k=4)).upper()
-        
-        for j in range(20000):
-            increase_factor = random.random() * 0.05 - 0.02
-            data.append({
-                "ticker": ticker,
-                "time_id": j + 1000,
-                "open": cur_price,
-                "close": cur_price * (1.0 + increase_factor),
-                "percentChange": increase_factor * 100.0,
-                "volume": avg_volume * (random.random() * 0.2 + 0.9)
-            })
-            cur_price *= (1.0 + increase_factor)
-        
-    with open('stock-data.csv', 'w', newline='') as csvfile:
-        fieldnames = ["ticker", 'time_id', 'open', "close", "percentChange", "volume"]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-
-        writer.writeheader()
-        for row in data:
-            writer.writerow(row)
\ No newline at end of file
+        cur_price = rng.random() * rng.integers(5, 3001)
+        avg_volume = rng.integers(1000, 5000001)
+        ticker = "".join(rng.choice(list(string.ascii_uppercase), 4))
+
+        # Walk the ticker in fixed size chunks, carrying the price across chunks
+        for start in range(0, n_ticks, chunk_size):
+            n = min(chunk_size, n_ticks - start)
+            increase_factor = rng.random(n) * 0.05 - 0.02
+            close = cur_price * np.cumprod(1.0 + increase_factor)
+            open_ = np.empty_like(close)
+            open_[0] = cur_price
+            open_[1:] = close[:-1]
+            volume = avg_volume * (rng.random(n) * 0.2 + 0.9)
+            cur_price = close[-1]
+            yield zip([ticker] * n, range(start + 1000, start + n + 1000), open_.tolist(),
+                      close.tolist(), (increase_factor * 100.0).tolist(), volume.tolist())
+
+
+def write_csv(f, chunks):
+    writer = csv.writer(f)
+    writer.writerow(fieldnames)
+    for rows in chunks:
+        writer.writerows(rows)
+
+
+def write_jsonl(f, chunks):
+    for rows in chunks:
+        f.writelines(json.dumps(dict(zip(fieldnames, row))) + "\n" for row in rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate stock tick data")
+    parser.add_argument("--tickers", type=int, default=100, help="number of tickers")
+    parser.add_argument("--ticks", type=int, default=20000, help="ticks per ticker")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="rows computed and written at a time")
+    parser.add_argument("--buffer-size", type=int, default=1 << 20, help="write buffer in bytes")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", default=None, help="defaults to stock-data.<format>")
+    args = parser.parse_args()
+
+    output = args.output or f"stock-data.{args.format}"
+    chunks = generate_rows(np.random.default_rng(args.seed), args.tickers, args.ticks, args.chunk_size)
+    with open(output, "w", newline="", buffering=args.buffer_size) as f:
+        if args.format == "csv":
+            write_csv(f, chunks)
+        else:
+            write_jsonl(f, chunks)
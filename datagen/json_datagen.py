@@ -1,44 +1,116 @@
 import json
 import argparse
 import string
-import random
+import hashlib
+import time
+import csv
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
 
-if __name__ == "__main__":
-    # Constants
-    sectors = ["communication", "energy", "materials", "industrials", "utilities",
-               "healthcare", "financials", "consumer discretionary", "consumer staples",
-               "infotech", "real estate"]
-    
-    # Number of files to generate
-    n_files = 10000
-    for i in range(n_files):
-        
-        # Starting variables
-        cur_price = random.random() * random.randint(5, 3000)
-        reviews = random.randint(5, 1000)
-        positive_reviews = random.randint(1, reviews)
-        avg_volume = random.randint(1000, 5000000)
-        
+# Constants
+sectors = ["communication", "energy", "materials", "industrials", "utilities",
+           "healthcare", "financials", "consumer discretionary", "consumer staples",
+           "infotech", "real estate"]
+n_ticks = 20
+
+
+def generate_shard(shard_id, start_oid, count, out_dir, seed, indent):
+    # Every shard gets its own stream derived from the run seed
+    rng = np.random.default_rng([seed, shard_id])
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    # Starting variables for the whole shard
+    start_price = rng.random(count) * rng.integers(5, 3001, count)
+    reviews = rng.integers(5, 1001, count)
+    positive_reviews = rng.integers(1, reviews + 1)
+    avg_volume = rng.integers(1000, 5000001, count)
+    tickers = rng.integers(0, len(string.ascii_uppercase), (count, 4))
+    sector_ids = rng.integers(0, len(sectors), count)
+
+    # Price walk and volume noise
+    increase_factor = rng.random((count, n_ticks)) * 0.05 - 0.02
+    close = start_price[:, None] * np.cumprod(1.0 + increase_factor, axis=1)
+    open_ = np.empty_like(close)
+    open_[:, 0] = start_price
+    open_[:, 1:] = close[:, :-1]
+    volume = avg_volume[:, None] * (rng.random((count, n_ticks)) * 0.2 + 0.9)
+    percent_change = increase_factor * 100.0
+
+    manifest = []
+    for i in range(count):
+        oid = start_oid + i
         data = [{
-            "ticker": "".join(random.choices(string.ascii_letters, k=4)).upper(),
-            "sector": random.choice(sectors),
+            "oid": oid,
+            "ticker": "".join(string.ascii_uppercase[k] for k in tickers[i]),
+            "sector": sectors[sector_ids[i]],
             "reviews": {
-                "total": reviews,
-                "positive": positive_reviews,
-                "negative": reviews - positive_reviews
+                "total": int(reviews[i]),
+                "positive": int(positive_reviews[i]),
+                "negative": int(reviews[i] - positive_reviews[i])
             },
-            "history": [],
-        }]
-        for j in range(20):
-            increase_factor = random.random() * 0.05 - 0.02
-            data[0]["history"].append({
+            "history": [{
                 "time_id": j + 1000,
-                "open": cur_price,
-                "close": cur_price * (1.0 + increase_factor),
-                "percentChange": increase_factor * 100.0,
-                "volume": avg_volume * (random.random() * 0.2 + 0.9)
-            })
-            cur_price *= (1.0 + increase_factor)
-        
-        with open(f"../data/stock-data-{i+1}.json", "w") as f:
-            f.write(json.dumps(data, indent=4))
+                "open": o,
+                "close": c,
+                "percentChange": p,
+                "volume": v
+            } for j, (o, c, p, v) in enumerate(zip(open_[i].tolist(), close[i].tolist(),
+                                                    percent_change[i].tolist(), volume[i].tolist()))],
+        }]
+        payload = json.dumps(data, indent=indent).encode()
+        path = out_dir / f"stock-data-{oid}.json"
+        with open(path, "wb") as f:
+            f.write(payload)
+        manifest.append((oid, str(path), len(payload), hashlib.md5(payload).hexdigest()))
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate stock data JSON objects")
+    parser.add_argument("--count", type=int, default=10000, help="number of files to generate")
+    parser.add_argument("--workers", type=int, default=None, help="number of generator processes")
+    parser.add_argument("--seed", type=int, default=None, help="run seed, random if not given")
+    parser.add_argument("--shard-dirs", nargs="+", default=["../data"], help="output directories, shards are spread round robin")
+    parser.add_argument("--shard-size", type=int, default=1000, help="objects per shard")
+    parser.add_argument("--start-oid", type=int, default=1)
+    parser.add_argument("--indent", type=int, default=4)
+    parser.add_argument("--manifest", default=None, help="manifest path, defaults to manifest.csv in the first shard dir")
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else int(np.random.SeedSequence().entropy % (2 ** 32))
+    indent = args.indent if args.indent > 0 else None
+    manifest_fp = Path(args.manifest) if args.manifest else Path(args.shard_dirs[0]) / "manifest.csv"
+    print(f"Seed: {seed}")
+
+    # Split the oid range into shards
+    shards = []
+    for shard_id, start in enumerate(range(0, args.count, args.shard_size)):
+        count = min(args.shard_size, args.count - start)
+        out_dir = args.shard_dirs[shard_id % len(args.shard_dirs)]
+        shards.append((shard_id, args.start_oid + start, count, out_dir, seed, indent))
+
+    # Fan out generation over the process pool
+    start_time = time.time()
+    manifest = []
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(generate_shard, *shard) for shard in shards]
+        for future in as_completed(futures):
+            manifest += future.result()
+    elapsed = time.time() - start_time
+
+    # Write manifest
+    manifest.sort()
+    manifest_fp.parent.mkdir(parents=True, exist_ok=True)
+    with open(manifest_fp, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["oid", "path", "size", "md5"])
+        writer.writerows(manifest)
+
+    # Metrics
+    total_bytes = sum(entry[2] for entry in manifest)
+    print(f"Files Written: {len(manifest)}")
+    print(f"Time Elapsed: {round(elapsed, 3)} seconds")
+    print(f"Speed: {round(len(manifest) / elapsed, 1)} files/s, {round(total_bytes / 1024.0 / 1024.0 / elapsed, 3)} MB/s")
+    print(f"Manifest: {manifest_fp}")
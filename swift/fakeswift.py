@@ -0,0 +1,452 @@
+import hashlib
+import json
+import os
+import shutil
+import struct
+import threading
+import time
+import uuid
+import bisect
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import urlsplit, unquote, parse_qs, quote
+import numpy as np
+from placement import RingData
+
+proxy_unit = "openstack-swift-proxy"
+object_unit = "openstack-swift-object"
+
+
+def journal_prefix(dt, host, unit, pid):
+    # journalctl short-precise format
+    name = "proxy-server" if unit == proxy_unit else "object-server"
+    return f"{dt:%b %d %H:%M:%S.%f} {host} {name}[{pid}]:"
+
+
+def parse_since(since):
+    if since is None:
+        return None
+    since = since.strip("'\"")
+    for fmt in ["%Y-%m-%d %H:%M:%S", "%H:%M:%S"]:
+        try:
+            dt = datetime.strptime(since, fmt)
+            if fmt == "%H:%M:%S":
+                now = datetime.now()
+                dt = dt.replace(year=now.year, month=now.month, day=now.day)
+            return dt
+        except ValueError:
+            pass
+    raise ValueError(f"Unsupported --since value: {since}")
+
+
+class FakeJournal:
+    def __init__(self, fp):
+        self.lock = threading.Lock()
+        self.appended = threading.Condition(self.lock)
+        self.entries = []
+        self.f = open(fp, "a", buffering=1)
+
+    def append(self, dt, line):
+        with self.lock:
+            self.entries.append((dt.replace(microsecond=0), line))
+            self.f.write(line + "\n")
+            self.appended.notify_all()
+
+    def read(self, since=None):
+        since = parse_since(since)
+        with self.lock:
+            entries = list(self.entries)
+        if since is None:
+            return [line for _, line in entries]
+        return [line for dt, line in entries if dt >= since]
+
+    def cursor(self, index):
+        # Cursors are "s=<journal id>;i=<entry index>" like journald's, the cursor entry itself is excluded
+        return f"s={id(self):x};i={index:x}"
+
+    def follow(self, cursor=None, since=None, stop=None):
+        # Like `journalctl -o json -f`, yields (cursor, line) after the cursor or since point as lines are appended
+        # until stop is set
+        with self.lock:
+            if cursor is not None:
+                position = int(dict(field.split("=", 1) for field in cursor.split(";")).get("i"), 16) + 1
+            elif since is not None:
+                since = parse_since(since)
+                position = next((i for i, (dt, _) in enumerate(self.entries) if dt >= since), len(self.entries))
+            else:
+                position = len(self.entries)
+        while True:
+            with self.lock:
+                while len(self.entries) <= position and not (stop is not None and stop.is_set()):
+                    self.appended.wait(0.2)
+                if stop is not None and stop.is_set():
+                    return
+                lines = [(self.cursor(i), line) for i, (_, line) in enumerate(self.entries[position:], position)]
+                position = len(self.entries)
+            yield from lines
+
+
+class FakeStorageNode:
+    def __init__(self, root, name, ip, pid):
+        self.name = name
+        self.ip = ip
+        self.pid = pid
+        self.up = True
+        self.device = Path(root) / ip / "srv" / "node" / "sdb"
+        self.objects = self.device / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.journal = FakeJournal(Path(root) / "log" / f"{ip}-object.log")
+
+    def object_dir(self, part, name_hash):
+        return self.objects / str(part) / name_hash[-3:] / name_hash
+
+    def put(self, part, name_hash, payload, ts):
+        fp = self.object_dir(part, name_hash)
+        fp.mkdir(parents=True, exist_ok=True)
+        for old in fp.glob("*.data"):
+            old.unlink()
+        with open(fp / f"{ts:.5f}.data", "wb") as f:
+            f.write(payload)
+
+    def get(self, part, name_hash):
+        fp = self.object_dir(part, name_hash)
+        data_files = sorted(fp.glob("*.data")) if fp.exists() else []
+        if not data_files:
+            return None
+        with open(data_files[-1], "rb") as f:
+            return f.read()
+
+    def delete(self, part, name_hash):
+        fp = self.object_dir(part, name_hash)
+        if fp.exists():
+            shutil.rmtree(fp)
+            return True
+        return False
+
+    def data_files(self):
+        return sorted(self.objects.rglob("*.data"))
+
+
+class FakeSwiftCluster:
+    def __init__(self, root, node_ips, replicas=2, part_power=10, account="AUTH_local", host="127.0.0.1", port=0,
+                 replication_kbps=1024):
+        self.root = Path(root)
+        (self.root / "log").mkdir(parents=True, exist_ok=True)
+        self.replicas = min(replicas, len(node_ips))
+        self.part_power = part_power
+        self.part_shift = 32 - part_power
+        self.account = account
+        self.nodes = {ip: FakeStorageNode(root, f"swift-object-{i + 1}", ip, 2000 + i) for i, ip in enumerate(node_ips)}
+        self.node_ips = list(node_ips)
+        # Replica r of partition p on node (p + r) % n, written out as a real object.ring.gz for placement lookups
+        parts = np.arange(1 << part_power)
+        self.ring = RingData([{"id": i, "region": 10, "zone": i + 1, "ip": ip, "port": 6200, "device": "sdb", "weight": 100}
+                              for i, ip in enumerate(self.node_ips)],
+                             self.part_shift, [(parts + r) % len(self.node_ips) for r in range(self.replicas)])
+        self.ring_fp = self.root / "object.ring.gz"
+        self.ring.save(self.ring_fp)
+        self.ring_version = 0
+        self.replication_kbps = replication_kbps
+        self.replicator = None
+        self.paths = {}
+        self.proxy_journal = FakeJournal(self.root / "log" / "proxy.log")
+        self.proxy_pid = 1000
+        self.lock = threading.Lock()
+        self.containers = {}
+        self.server = ThreadingHTTPServer((host, port), FakeSwiftHandler)
+        self.server.cluster = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def auth_url(self):
+        return f"{self.url}/v3"
+
+    @property
+    def storage_url(self):
+        return f"{self.url}/v1/{self.account}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def partition(self, account, container, obj):
+        name_hash = hashlib.md5(f"/{account}/{container}/{obj}".encode()).hexdigest()
+        return struct.unpack_from(">I", bytes.fromhex(name_hash))[0] >> self.part_shift, name_hash
+
+    def replica_nodes(self, part):
+        return [self.ring.devs[int(row[part])]["ip"] for row in self.ring.replica2part2dev]
+
+    # Object server side, one log line per replica write like the real object servers
+    def object_request(self, ip, method, part, name_hash, path, txid, payload=None):
+        node = self.nodes[ip]
+        start = time.time()
+        if not node.up:
+            return 503, None
+        if method == "PUT":
+            node.put(part, name_hash, payload, start)
+            self.paths[name_hash] = path
+            status, body = 201, None
+        elif method == "DELETE":
+            status, body = (204 if node.delete(part, name_hash) else 404), None
+        else:
+            body = node.get(part, name_hash)
+            status = 200 if body is not None else 404
+            if method == "HEAD":
+                body = None if status == 404 else body
+        dt = datetime.now()
+        node.journal.append(dt, f"{journal_prefix(dt, node.name, object_unit, node.pid)} "
+                                f"127.0.0.1 - - [{dt:%d/%b/%Y:%H:%M:%S} +0000] \"{method} /sdb/{part}{quote(path)}\" "
+                                f"{status} - \"{method} {self.url}/v1{quote(path)}\" \"{txid}\" \"proxy-server {self.proxy_pid}\" "
+                                f"{time.time() - start:.4f} \"-\" {node.pid} 0")
+        return status, body
+
+    def set_ring(self, ring):
+        # Swap in a rebalanced ring, the replicator then moves objects to their new nodes in the background
+        with self.lock:
+            self.ring = ring
+            self.ring.save(self.ring_fp)
+            self.ring_version += 1
+            version = self.ring_version
+        self.replicator = threading.Thread(target=self.replicate, args=(version,))
+        self.replicator.daemon = True
+        self.replicator.start()
+
+    @property
+    def replicating(self):
+        return self.replicator is not None and self.replicator.is_alive()
+
+    def replicate(self, version):
+        # One pass over every node: push each object to replica nodes missing it (logged as object server PUTs),
+        # then drop copies the ring no longer puts there. Throttled to replication_kbps like a real replicator
+        start = time.time()
+        sent = 0
+        for ip, node in list(self.nodes.items()):
+            for fp in node.data_files():
+                if self.ring_version != version:
+                    return
+                part, name_hash = int(fp.parent.parent.parent.name), fp.parent.name
+                path = self.paths.get(name_hash)
+                if path is None or not node.up or not fp.exists():
+                    continue
+                targets = self.replica_nodes(part)
+                payload = node.get(part, name_hash)
+                if payload is None:
+                    continue
+                stored = True
+                for target in targets:
+                    if target == ip or self.nodes[target].get(part, name_hash) is not None:
+                        continue
+                    status, _ = self.object_request(target, "PUT", part, name_hash, path, f"tx{uuid.uuid4().hex[:21]}-{int(time.time()):010x}",
+                                                    payload)
+                    stored = stored and status == 201
+                    sent += len(payload)
+                    delay = sent / 1024.0 / self.replication_kbps - (time.time() - start)
+                    if delay > 0:
+                        time.sleep(delay)
+                if ip not in targets and stored:
+                    node.delete(part, name_hash)
+
+    def log_proxy(self, start, method, path, status, token, bytes_recvd, bytes_sent, etag, txid):
+        end = time.time()
+        dt = datetime.fromtimestamp(start)
+        self.proxy_journal.append(dt, f"{journal_prefix(dt, 'controller', proxy_unit, self.proxy_pid)} "
+                                      f"127.0.0.1 127.0.0.1 {dt:%d/%b/%Y/%H/%M/%S} {method} {quote(path)} HTTP/1.0 "
+                                      f"{status} - python-swiftclient {(token or '-')[:16]}... "
+                                      f"{bytes_recvd if bytes_recvd else '-'} {bytes_sent if bytes_sent else '-'} "
+                                      f"{etag or '-'} {txid} - {end - start:.4f} - - {start:.9f} {end:.9f} 0")
+
+    # Local equivalent of `journalctl -u <unit> --since <ts>`
+    def journal(self, unit, since=None, node=None):
+        journal = self.proxy_journal if unit == proxy_unit else self.nodes[node].journal
+        return "\n".join(journal.read(since))
+
+    def follow(self, unit, since=None, node=None, after_cursor=None, stop=None):
+        journal = self.proxy_journal if unit == proxy_unit else self.nodes[node].journal
+        return journal.follow(after_cursor, since, stop)
+
+    # Local equivalents of the stats.sh verbs
+    def stats(self, verb, ip, *args):
+        node = self.nodes[ip]
+        if verb == "datacount":
+            return str(len(node.data_files()))
+        elif verb == "dataloc":
+            lines = []
+            for fp in node.data_files():
+                with open(fp, "r") as f:
+                    lines += [line.rstrip("\n") for _, line in zip(range(3), f) if "oid" in line]
+            return "\n".join(lines)
+        elif verb == "data-delete":
+            for sub in ["objects", "containers", "accounts"]:
+                shutil.rmtree(node.device / sub, ignore_errors=True)
+            node.objects.mkdir(parents=True, exist_ok=True)
+            return ""
+        elif verb == "object-requests":
+            method, since = args[0], args[1] if len(args) > 1 else None
+            since = None if since == "None" else since
+            return "\n".join(line for line in node.journal.read(since) if method in line)
+        elif verb == "initconfig":
+            return ""
+        raise ValueError(f"Unsupported stats verb: {verb}")
+
+    def set_node_status(self, ip, up):
+        self.nodes[ip].up = up
+
+
+class FakeSwiftHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def respond(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        if "Content-Length" not in (headers or {}):
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def do_POST(self):
+        cluster = self.server.cluster
+        self.read_body()
+        if not urlsplit(self.path).path.endswith("/auth/tokens"):
+            return self.respond(404)
+        expires = datetime.utcfromtimestamp(time.time() + 3600).strftime("%Y-%m-%dT%H:%M:%S.000000Z")
+        body = {
+            "token": {
+                "expires_at": expires,
+                "catalog": [{
+                    "type": "object-store",
+                    "endpoints": [{"interface": "public", "url": cluster.storage_url}]
+                }]
+            }
+        }
+        self.respond(201, json.dumps(body).encode(), {"X-Subject-Token": uuid.uuid4().hex,
+                                                      "Content-Type": "application/json"})
+
+    def handle_swift(self):
+        cluster = self.server.cluster
+        start = time.time()
+        txid = f"tx{uuid.uuid4().hex[:21]}-{int(start):010x}"
+        parts = urlsplit(self.path)
+        path = unquote(parts.path)
+        segments = path.lstrip("/").split("/", 3)
+        payload = self.read_body() if self.command == "PUT" else None
+        if len(segments) < 2 or segments[0] != "v1" or segments[1] != cluster.account:
+            return self.respond(404)
+        token = self.headers.get("X-Auth-Token")
+
+        if len(segments) == 2:
+            status, body, headers = self.account_request()
+        elif len(segments) == 3:
+            status, body, headers = self.container_request(segments[2], parse_qs(parts.query))
+        else:
+            status, body, headers = self.object_request(segments[2], segments[3], path, txid, payload)
+        headers["X-Trans-Id"] = txid
+        cluster.log_proxy(start, self.command, path, status, token, len(payload) if payload else None,
+                          len(body) if body else None, headers.get("Etag"), txid)
+        self.respond(status, body or b"", headers)
+
+    def account_request(self):
+        cluster = self.server.cluster
+        if self.command != "GET":
+            return 204, None, {}
+        with cluster.lock:
+            listing = [{"name": c, "count": len(objs)} for c, objs in sorted(cluster.containers.items())]
+        return 200, json.dumps(listing).encode(), {"Content-Type": "application/json"}
+
+    def container_request(self, container, query):
+        cluster = self.server.cluster
+        with cluster.lock:
+            if self.command == "PUT":
+                cluster.containers.setdefault(container, [])
+                return 201, None, {}
+            if container not in cluster.containers:
+                return 404, None, {}
+            if self.command == "DELETE":
+                del cluster.containers[container]
+                return 204, None, {}
+            names = cluster.containers[container]
+            marker = query.get("marker", [""])[0]
+            prefix = query.get("prefix", [""])[0]
+            limit = int(query.get("limit", ["10000"])[0])
+            listing = []
+            for name in names[bisect.bisect_right(names, marker):]:
+                if len(listing) >= limit:
+                    break
+                if name.startswith(prefix):
+                    listing.append({"name": name})
+        if self.command == "HEAD":
+            return 204, None, {"X-Container-Object-Count": str(len(names))}
+        return 200, json.dumps(listing).encode(), {"Content-Type": "application/json"}
+
+    def object_request(self, container, obj, path, txid, payload):
+        cluster = self.server.cluster
+        part, name_hash = cluster.partition(cluster.account, container, obj)
+        nodes = cluster.replica_nodes(part)
+        # Object servers see the path without the API version
+        path = f"/{cluster.account}/{container}/{obj}"
+        headers = {}
+        if self.command == "PUT":
+            statuses = [cluster.object_request(ip, "PUT", part, name_hash, path, txid, payload)[0] for ip in nodes]
+            # Same quorum as a replicated storage policy
+            if statuses.count(201) < (len(nodes) + 1) // 2:
+                return 503, None, headers
+            with cluster.lock:
+                names = cluster.containers.setdefault(container, [])
+                i = bisect.bisect_left(names, obj)
+                if i == len(names) or names[i] != obj:
+                    names.insert(i, obj)
+            headers["Etag"] = hashlib.md5(payload).hexdigest()
+            return 201, None, headers
+        if self.command == "DELETE":
+            statuses = [cluster.object_request(ip, "DELETE", part, name_hash, path, txid)[0] for ip in nodes]
+            with cluster.lock:
+                names = cluster.containers.get(container, [])
+                i = bisect.bisect_left(names, obj)
+                if i < len(names) and names[i] == obj:
+                    names.pop(i)
+            return (204 if 204 in statuses else 404), None, headers
+        # GET/HEAD from the first replica that answers
+        for ip in nodes:
+            status, body = cluster.object_request(ip, "GET", part, name_hash, path, txid)
+            if status == 200:
+                headers["Etag"] = hashlib.md5(body).hexdigest()
+                if self.command == "HEAD":
+                    headers["Content-Length"] = str(len(body))
+                    return 200, None, headers
+                return 200, body, headers
+        return 404, None, headers
+
+    do_GET = handle_swift
+    do_HEAD = handle_swift
+    do_PUT = handle_swift
+    do_DELETE = handle_swift
+
+
+if __name__ == "__main__":
+    with open("swiftconfig.json", "r") as f:
+        ring_conf = json.load(f)
+    cluster = FakeSwiftCluster(os.environ.get("FAKE_SWIFT_ROOT", "local-cluster"), ring_conf.get("storage_nodes"),
+                               replicas=ring_conf.get("object").get("replicas"), port=8080).start()
+    print(f"Fake Swift listening on {cluster.url}, auth url {cluster.auth_url}")
+    cluster.thread.join()
@@ -0,0 +1,65 @@
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class NodeResult:
+    __slots__ = ["node", "value", "error", "elapsed"]
+
+    def __init__(self, node, value=None, error=None, elapsed=0.0):
+        self.node = node
+        self.value = value
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class FanOut:
+    # Runs fn(node, timeout) on every node at once; each call gets its own timeout and the whole
+    # fan-out gives up on stragglers after `budget` seconds so one dead node costs one timeout, not one per node
+    def __init__(self, max_workers=64, timeout=3, budget=10):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.budget = budget
+        self.results = []
+        self.elapsed = 0.0
+
+    def call(self, fn, node):
+        start = time.time()
+        try:
+            return NodeResult(node, fn(node, self.timeout), elapsed=time.time() - start)
+        except subprocess.TimeoutExpired:
+            return NodeResult(node, error="timeout", elapsed=time.time() - start)
+        except Exception as e:
+            return NodeResult(node, error=str(e) or type(e).__name__, elapsed=time.time() - start)
+
+    def run(self, fn, nodes):
+        nodes = list(nodes)
+        start = time.time()
+        executor = ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(nodes))))
+        futures = [executor.submit(self.call, fn, node) for node in nodes]
+        done, _ = wait(futures, timeout=self.budget)
+        # Stragglers keep running in the background, their results are dropped
+        executor.shutdown(wait=False)
+        self.elapsed = time.time() - start
+        self.results = []
+        for node, future in zip(nodes, futures):
+            if future in done:
+                self.results.append(future.result())
+            else:
+                future.cancel()
+                self.results.append(NodeResult(node, error="over time budget", elapsed=self.elapsed))
+        return self.results
+
+    def failures(self):
+        return [r for r in self.results if not r.ok]
+
+    def report(self):
+        failed = self.failures()
+        if failed:
+            print(f"{len(failed)}/{len(self.results)} nodes failed: " +
+                  ", ".join(f"{r.node} ({r.error})" for r in failed))
+        return failed
@@ -0,0 +1,119 @@
+import math
+import threading
+import numpy as np
+from prettytable import PrettyTable
+
+latency_columns = ["Mean (s)", "p50 (s)", "p90 (s)", "p99 (s)", "p99.9 (s)", "Max (s)"]
+
+
+class LatencyHistogram:
+    # HDR style buckets: one per power of two above `lowest`, each split into `sub_buckets` linear steps,
+    # so every recorded value is kept to within 1 / sub_buckets relative error in fixed memory
+    def __init__(self, lowest=1e-6, highest=3600.0, sub_buckets=64):
+        self.lowest = lowest
+        self.highest = highest
+        self.sub_buckets = sub_buckets
+        self.counts = [0] * (int(math.ceil(math.log2(highest / lowest))) + 1) * sub_buckets
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def index(self, value):
+        scaled = value / self.lowest
+        if scaled < 1.0:
+            return 0
+        m, e = math.frexp(scaled)
+        return min(len(self.counts) - 1, (e - 1) * self.sub_buckets + int((m * 2.0 - 1.0) * self.sub_buckets))
+
+    def value_at(self, index):
+        bucket, sub = divmod(index, self.sub_buckets)
+        return self.lowest * 2.0 ** bucket * (1.0 + (sub + 0.5) / self.sub_buckets)
+
+    def record(self, value):
+        self.counts[self.index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def record_array(self, values):
+        # Vectorized record for a whole column of latencies
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        m, e = np.frexp(values / self.lowest)
+        index = (e.astype(np.int64) - 1) * self.sub_buckets + ((m * 2.0 - 1.0) * self.sub_buckets).astype(np.int64)
+        index = np.clip(np.where(values < self.lowest, 0, index), 0, len(self.counts) - 1)
+        self.counts = (np.asarray(self.counts) + np.bincount(index, minlength=len(self.counts))).tolist()
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other):
+        counts = self.counts
+        for i, c in enumerate(other.counts):
+            if c:
+                counts[i] += c
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        return self
+
+    def percentile(self, p):
+        if self.count == 0:
+            return 0.0
+        rank = max(1, int(math.ceil(p / 100.0 * self.count)))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return min(self.value_at(i), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def row(self, digits=4):
+        # Same order as latency_columns
+        return [round(self.mean(), digits)] + [round(self.percentile(p), digits) for p in [50, 90, 99, 99.9]] + \
+               [round(self.max, digits)]
+
+
+class ThreadHistograms:
+    # One histogram per thread, so record() never takes a lock; merged() sums them when reporting
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.histograms = []
+
+    def get(self):
+        hist = getattr(self.local, "hist", None)
+        if hist is None:
+            hist = self.local.hist = LatencyHistogram(**self.kwargs)
+            with self.lock:
+                self.histograms.append(hist)
+        return hist
+
+    def record(self, value):
+        self.get().record(value)
+
+    def merged(self):
+        total = LatencyHistogram(**self.kwargs)
+        with self.lock:
+            histograms = list(self.histograms)
+        for hist in histograms:
+            total.merge(hist)
+        return total
+
+
+def latency_table(histograms, label="Node"):
+    # One row per key and a merged cluster-wide row
+    t = PrettyTable([label, "Requests"] + latency_columns)
+    total = LatencyHistogram()
+    for name in sorted(histograms):
+        hist = histograms[name]
+        total.merge(hist)
+        t.add_row([name, hist.count] + hist.row())
+    t.add_row(["cluster", total.count] + total.row())
+    return t
@@ -0,0 +1,363 @@
+import random
+import threading
+import time
+from queue import Queue
+import numpy as np
+from prettytable import PrettyTable
+from histogram import LatencyHistogram, latency_columns
+
+
+class UniformKeys:
+    def __init__(self, lo, hi):
+        self.lo = lo
+        self.hi = hi
+
+    def next(self, rng):
+        return rng.randint(self.lo, self.hi)
+
+
+class ZipfianKeys:
+    # Gray et al. "Quickly generating billion-record synthetic databases", as used by YCSB
+    def __init__(self, lo, hi, skew=0.99):
+        # The generator divides by 1 - skew, and skew <= 0 is not skewed at all
+        if not 0 < skew < 1:
+            raise ValueError(f"Zipfian skew must be between 0 and 1 (exclusive), got {skew}")
+        self.lo = lo
+        self.n = hi - lo + 1
+        self.theta = skew
+        self.zetan = self.zeta(self.n, skew)
+        self.alpha = 1.0 / (1.0 - skew)
+        self.eta = (1 - (2.0 / self.n) ** (1 - skew)) / (1 - self.zeta(2, skew) / self.zetan)
+
+    def zeta(self, n, theta):
+        return float(np.sum(1.0 / np.arange(1, n + 1, dtype=np.float64) ** theta))
+
+    def rank(self, rng):
+        u = rng.random()
+        uz = u * self.zetan
+        if uz < 1.0:
+            return 0
+        if uz < 1.0 + 0.5 ** self.theta:
+            return 1
+        return min(self.n - 1, int(self.n * (self.eta * u - self.eta + 1) ** self.alpha))
+
+    def next(self, rng):
+        return self.lo + self.rank(rng)
+
+
+class HotspotKeys:
+    def __init__(self, lo, hi, hot_fraction=0.2, hot_ops=0.8):
+        self.lo = lo
+        self.hi = hi
+        self.hot_hi = lo + max(1, int((hi - lo + 1) * hot_fraction)) - 1
+        self.hot_ops = hot_ops
+
+    def next(self, rng):
+        if rng.random() < self.hot_ops or self.hot_hi >= self.hi:
+            return rng.randint(self.lo, self.hot_hi)
+        return rng.randint(self.hot_hi + 1, self.hi)
+
+
+class LatestKeys:
+    # Zipfian over recency, newest object is the most popular
+    def __init__(self, lo, hi, skew=0.99):
+        self.lo = lo
+        self.hi = hi
+        self.zipf = ZipfianKeys(lo, hi, skew)
+
+    def next(self, rng):
+        return max(self.lo, self.hi - self.zipf.rank(rng))
+
+
+def key_chooser(dist, lo, hi, skew=0.99):
+    if dist == "uniform":
+        return UniformKeys(lo, hi)
+    elif dist == "zipfian":
+        return ZipfianKeys(lo, hi, skew)
+    elif dist == "hotspot":
+        return HotspotKeys(lo, hi)
+    elif dist == "latest":
+        return LatestKeys(lo, hi, skew)
+    raise ValueError(f"Unknown key distribution: {dist}")
+
+
+class ReadLoadGenerator:
+    def __init__(self, conn_factory, container, object_name, chooser, workers=8, duration=30, seed=None):
+        self.conn_factory = conn_factory
+        self.container = container
+        self.object_name = object_name
+        self.chooser = chooser
+        self.workers = workers
+        self.duration = duration
+        self.seed = seed
+        self.latencies = LatencyHistogram()
+        self.keys = set()
+        self.errors = 0
+        self.bytes = 0
+        self.elapsed = 0.0
+        self.lock = threading.Lock()
+
+    def worker(self, worker_id, deadline):
+        rng = random.Random(None if self.seed is None else self.seed + worker_id)
+        conn = self.conn_factory()
+        latencies = LatencyHistogram()
+        keys = set()
+        errors = 0
+        nbytes = 0
+        # Closed loop: the next request goes out as soon as the previous one returns
+        while time.time() < deadline:
+            oid = self.chooser.next(rng)
+            start = time.time()
+            try:
+                _, body = conn.get_object(self.container, self.object_name(oid))
+                latencies.record(time.time() - start)
+                nbytes += len(body)
+                keys.add(oid)
+            except Exception:
+                errors += 1
+        with self.lock:
+            self.latencies.merge(latencies)
+            self.keys |= keys
+            self.errors += errors
+            self.bytes += nbytes
+
+    def run(self):
+        start = time.time()
+        deadline = start + self.duration
+        threads = [threading.Thread(target=self.worker, args=(i, deadline)) for i in range(self.workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.elapsed = time.time() - start
+
+    def __repr__(self):
+        elapsed = self.elapsed if self.elapsed > 0 else float("inf")
+        t = PrettyTable(["Requests", "Errors", "Distinct Keys", "Workers", "Elapsed (s)", "Requests/s", "KB/s"] +
+                        latency_columns)
+        t.add_row([self.latencies.count, self.errors, len(self.keys), self.workers, round(self.elapsed, 3),
+                   round(self.latencies.count / elapsed, 1), round(self.bytes / 1024.0 / elapsed, 3)] +
+                  self.latencies.row())
+        return str(t)
+
+
+class OpenLoopGenerator:
+    def __init__(self, conn_factory, operation, rate, duration=30, arrival="poisson", workers=64, seed=None):
+        self.conn_factory = conn_factory
+        self.operation = operation
+        self.rate = rate
+        self.duration = duration
+        self.arrival = arrival
+        self.workers = workers
+        self.seed = seed
+        self.q = Queue()
+        self.lock = threading.Lock()
+        self.latencies = LatencyHistogram()
+        self.service_times = LatencyHistogram()
+        self.max_send_delay = 0.0
+        self.errors = 0
+        self.bytes = 0
+        self.sent = 0
+        self.elapsed = 0.0
+
+    def schedule(self):
+        # Intended send offsets from the start of the run
+        rng = random.Random(self.seed)
+        offset = 0.0
+        while True:
+            if self.arrival == "poisson":
+                offset += rng.expovariate(self.rate)
+            else:
+                offset += 1.0 / self.rate
+            if offset >= self.duration:
+                break
+            yield offset
+
+    def dispatch(self, start):
+        for seq, offset in enumerate(self.schedule()):
+            intended = start + offset
+            delay = intended - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            self.q.put((seq, intended))
+            self.sent += 1
+        for _ in range(self.workers):
+            self.q.put(None)
+
+    def worker(self, worker_id):
+        rng = random.Random(None if self.seed is None else self.seed + worker_id + 1)
+        conn = self.conn_factory()
+        latencies = LatencyHistogram()
+        service_times = LatencyHistogram()
+        max_send_delay = 0.0
+        errors = 0
+        nbytes = 0
+        while True:
+            item = self.q.get()
+            if item is None:
+                break
+            seq, intended = item
+            actual = time.time()
+            try:
+                nbytes += self.operation(conn, seq, rng)
+                end = time.time()
+                # Measured from the intended send time so queueing behind a slow cluster counts
+                latencies.record(end - intended)
+                service_times.record(end - actual)
+                max_send_delay = max(max_send_delay, actual - intended)
+            except Exception:
+                errors += 1
+        with self.lock:
+            self.latencies.merge(latencies)
+            self.service_times.merge(service_times)
+            self.max_send_delay = max(self.max_send_delay, max_send_delay)
+            self.errors += errors
+            self.bytes += nbytes
+
+    def run(self):
+        start = time.time()
+        threads = [threading.Thread(target=self.worker, args=(i,)) for i in range(self.workers)]
+        for t in threads:
+            t.start()
+        self.dispatch(start)
+        for t in threads:
+            t.join()
+        self.elapsed = time.time() - start
+
+    def __repr__(self):
+        completed = self.latencies.count
+        t = PrettyTable(["Target (req/s)", "Sent", "Completed", "Errors", "Achieved (req/s)", "Elapsed (s)",
+                         "Max Send Delay (s)"])
+        t.add_row([self.rate, self.sent, completed, self.errors,
+                   round(completed / self.elapsed, 1) if self.elapsed > 0 else 0, round(self.elapsed, 3),
+                   round(self.max_send_delay, 4)])
+        s = PrettyTable(["Measure"] + latency_columns)
+        for name, hist in [("latency", self.latencies), ("service time", self.service_times)]:
+            s.add_row([name] + hist.row())
+        return str(t) + "\n" + str(s)
+
+
+workload_presets = {
+    "read-heavy": {"mix": {"read": 0.95, "update": 0.05}, "dist": "zipfian"},
+    "update-heavy": {"mix": {"read": 0.5, "update": 0.5}, "dist": "zipfian"},
+    "read-modify-write": {"mix": {"read": 0.5, "rmw": 0.5}, "dist": "zipfian"},
+    "insert-latest": {"mix": {"read": 0.95, "insert": 0.05}, "dist": "latest"},
+    "scan": {"mix": {"scan": 0.95, "insert": 0.05}, "dist": "zipfian"}
+}
+
+
+class Workload:
+    def __init__(self, conn_factory, container, object_name, payload, preset, lo, hi,
+                 workers=8, duration=30, scan_length=100, skew=0.99, seed=None):
+        self.conn_factory = conn_factory
+        self.container = container
+        self.object_name = object_name
+        self.payload = payload
+        self.preset = preset
+        self.mix = workload_presets[preset]["mix"]
+        self.chooser = key_chooser(workload_presets[preset]["dist"], lo, hi, skew)
+        self.workers = workers
+        self.duration = duration
+        self.scan_length = scan_length
+        self.seed = seed
+        self.next_oid = hi + 1
+        # Inserts finish out of order, reads only follow the highest oid below which every insert has finished
+        self.acked_oid = hi
+        self.finished = set()
+        self.failed_inserts = []
+        self.lock = threading.Lock()
+        self.latencies = {op: LatencyHistogram() for op in self.mix}
+        self.errors = {op: 0 for op in self.mix}
+        self.elapsed = 0.0
+
+    def choose_op(self, rng):
+        u = rng.random()
+        for op, fraction in self.mix.items():
+            if u < fraction:
+                return op
+            u -= fraction
+        return op
+
+    def insert_oid(self):
+        with self.lock:
+            oid = self.next_oid
+            self.next_oid += 1
+        return oid
+
+    def finish_insert(self, oid, ok):
+        with self.lock:
+            if not ok:
+                self.failed_inserts.append(oid)
+            self.finished.add(oid)
+            while self.acked_oid + 1 in self.finished:
+                self.acked_oid += 1
+                self.finished.discard(self.acked_oid)
+            # A failed oid is passed over so one error does not freeze the range; reads of it count as errors
+            if getattr(self.chooser, "hi", self.acked_oid) < self.acked_oid:
+                self.chooser.hi = self.acked_oid
+
+    def execute(self, conn, op, rng):
+        if op == "read":
+            conn.get_object(self.container, self.object_name(self.chooser.next(rng)))
+        elif op == "update":
+            oid = self.chooser.next(rng)
+            conn.put_object(self.container, self.object_name(oid), self.payload(oid))
+        elif op == "rmw":
+            oid = self.chooser.next(rng)
+            conn.get_object(self.container, self.object_name(oid))
+            conn.put_object(self.container, self.object_name(oid), self.payload(oid))
+        elif op == "insert":
+            oid = self.insert_oid()
+            try:
+                conn.put_object(self.container, self.object_name(oid), self.payload(oid))
+            except Exception:
+                self.finish_insert(oid, False)
+                raise
+            self.finish_insert(oid, True)
+        elif op == "scan":
+            # Listing is ordered by name, so this starts at an arbitrary point of the namespace
+            conn.get_container(self.container, marker=self.object_name(self.chooser.next(rng)),
+                               limit=self.scan_length)
+
+    def worker(self, worker_id, deadline):
+        rng = random.Random(None if self.seed is None else self.seed + worker_id)
+        conn = self.conn_factory()
+        latencies = {op: LatencyHistogram() for op in self.mix}
+        errors = {op: 0 for op in self.mix}
+        while time.time() < deadline:
+            op = self.choose_op(rng)
+            start = time.time()
+            try:
+                self.execute(conn, op, rng)
+                latencies[op].record(time.time() - start)
+            except Exception:
+                errors[op] += 1
+        with self.lock:
+            for op in self.mix:
+                self.latencies[op].merge(latencies[op])
+                self.errors[op] += errors[op]
+
+    def run(self):
+        start = time.time()
+        deadline = start + self.duration
+        threads = [threading.Thread(target=self.worker, args=(i, deadline)) for i in range(self.workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.elapsed = time.time() - start
+
+    def __repr__(self):
+        elapsed = self.elapsed if self.elapsed > 0 else float("inf")
+        t = PrettyTable(["Operation", "Requests", "Errors", "Ops/s"] + latency_columns)
+        total = LatencyHistogram()
+        for op in self.mix:
+            hist = self.latencies[op]
+            total.merge(hist)
+            t.add_row([op, hist.count, self.errors[op], round(hist.count / elapsed, 1)] + hist.row())
+        t.add_row(["total", total.count, sum(self.errors.values()), round(total.count / elapsed, 1)] + total.row())
+        if self.failed_inserts:
+            oids = sorted(self.failed_inserts)
+            return str(t) + f"\nFailed inserts ({len(oids)}): " + ", ".join(str(oid) for oid in oids[:20]) + \
+                (" ..." if len(oids) > 20 else "")
+        return str(t)
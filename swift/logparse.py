@@ -0,0 +1,278 @@
+import re
+import json
+import time
+import argparse
+from collections import namedtuple
+from operator import itemgetter
+from datetime import datetime
+
+LogRecord = namedtuple("LogRecord", ["ts", "method", "path", "oid", "status", "bytes", "duration", "node", "part"])
+
+# journalctl short / short-precise prefix: "Oct 18 12:00:00[.123456] host unit[pid]: "
+prefix = r"^([A-Z][a-z]{2}) +(\d+) (\d\d:\d\d:\d\d(?:\.\d+)?) (\S+) "
+
+# client_ip remote_addr datetime method path protocol status referer user_agent auth_token
+# bytes_recvd bytes_sent client_etag transaction_id headers request_time source log_info start_time ...
+proxy_pattern = re.compile(
+    prefix + r"proxy-server(?:\[\d+\])?: \S+ \S+ \S+ ([A-Z]+) ((?:[^ /]*/)*(?:stock-data-(\d+)\.json|\S*)) \S+ (\d+) "
+    r"\S+ \S+ \S+ (\S+) (\S+) \S+ \S+ \S+ ([\d.]+)(?: \S+ \S+ ([\d.]+))?",
+    re.M)
+
+# remote_addr - - [datetime] "method /device/partition/path" status content_length "referer" "txid" "user_agent" request_time ...
+object_pattern = re.compile(
+    prefix + r"object-server(?:\[\d+\])?: \S+ \S+ \S+ \[[^\]]*\] \"([A-Z]+) /[^/]+/(\d+)"
+    r"((?:[^\"/]*/)*(?:stock-data-(\d+)\.json|[^\"/]*))\" "
+    r"(\d+) (\S+) \"[^\"]*\" \"[^\"]*\" \"[^\"]*\" ([\d.]+)",
+    re.M)
+
+months = {m: i + 1 for i, m in enumerate(["Jan", "Feb", "Mar", "Apr", "May", "Jun",
+                                           "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"])}
+
+
+second_cache = {}
+
+
+def journal_ts(mon, day, seconds):
+    # Local time epoch; journal lines carry no year so the current one is assumed
+    key = (mon, day, seconds)
+    ts = second_cache.get(key)
+    if ts is None:
+        if len(second_cache) > 100000:
+            second_cache.clear()
+        h, m, s = seconds.split(":")
+        ts = time.mktime((datetime.now().year, months[mon], int(day), int(h), int(m), int(s), 0, 0, -1))
+        second_cache[key] = ts
+    return ts
+
+
+def proxy_records(matches, method=None):
+    records = []
+    append = records.append
+    last_key = None
+    base = 0.0
+    for mon, day, clock_, host, method_, path, oid, status, recvd, sent, duration, start in matches:
+        if method is not None and method_ != method:
+            continue
+        if start:
+            ts = float(start)
+        else:
+            # Most consecutive lines share a second, only convert when it changes
+            key = day + clock_[:8]
+            if key != last_key:
+                base = journal_ts(mon, day, clock_[:8])
+                last_key = key
+            ts = base + float(clock_[8:]) if len(clock_) > 8 else base
+        size = recvd if method_ == "PUT" else sent
+        append(LogRecord(ts, method_, path, int(oid) if oid else -1, int(status), int(size) if size.isdigit() else 0,
+                         float(duration), host, -1))
+    return records
+
+
+def object_records(matches, method=None):
+    records = []
+    append = records.append
+    last_key = None
+    base = 0.0
+    for mon, day, clock_, host, method_, part, path, oid, status, length, duration in matches:
+        if method is not None and method_ != method:
+            continue
+        key = day + clock_[:8]
+        if key != last_key:
+            base = journal_ts(mon, day, clock_[:8])
+            last_key = key
+        append(LogRecord(base + float(clock_[8:]) if len(clock_) > 8 else base, method_, path, int(oid) if oid else -1,
+                         int(status), int(length) if length.isdigit() else 0, float(duration), host, int(part)))
+    return records
+
+
+# Group index of each field in proxy_pattern / object_pattern matches
+proxy_groups = {"mon": 0, "day": 1, "clock": 2, "node": 3, "method": 4, "path": 5, "oid": 6, "status": 7,
+                "recvd": 8, "sent": 9, "duration": 10, "start": 11}
+object_groups = {"mon": 0, "day": 1, "clock": 2, "node": 3, "method": 4, "part": 5, "path": 6, "oid": 7,
+                 "status": 8, "bytes": 9, "duration": 10}
+
+
+class LogColumns:
+    # The LogRecord fields of many lines as lists. Matches are kept as they come out of findall and a field is
+    # converted for every line at once, the first time it is asked for, instead of building a LogRecord per line
+    def __init__(self, kind, matches):
+        self.kind = kind
+        self.matches = matches
+        self.groups = proxy_groups if kind == "proxy" else object_groups
+        self.cache = {}
+
+    def __len__(self):
+        return len(self.matches)
+
+    def raw(self, name):
+        return list(map(itemgetter(self.groups[name]), self.matches))
+
+    def column(self, name):
+        if name not in self.cache:
+            self.cache[name] = self.convert(name)
+        return self.cache[name]
+
+    def convert(self, name):
+        if name == "ts":
+            return self.timestamps()
+        elif name == "oid":
+            return [int(oid) if oid else -1 for oid in self.raw("oid")]
+        elif name == "status":
+            return list(map(int, self.raw("status")))
+        elif name == "duration":
+            return list(map(float, self.raw("duration")))
+        elif name == "part":
+            return list(map(int, self.raw("part"))) if self.kind == "object" else [-1] * len(self.matches)
+        elif name == "bytes":
+            if self.kind == "proxy":
+                sizes = [recvd if method == "PUT" else sent
+                         for method, recvd, sent in map(itemgetter(4, 8, 9), self.matches)]
+            else:
+                sizes = self.raw("bytes")
+            return [int(size) if size.isdigit() else 0 for size in sizes]
+        return self.raw(name)
+
+    def timestamps(self):
+        # Proxy lines carry their own start time, the rest convert the journal clock once per second
+        starts = self.raw("start") if self.kind == "proxy" else [""] * len(self.matches)
+        if all(starts):
+            return list(map(float, starts))
+        ts = []
+        append = ts.append
+        last_key = None
+        base = 0.0
+        for (mon, day, clock_), start in zip(map(itemgetter(0, 1, 2), self.matches), starts):
+            if start:
+                append(float(start))
+                continue
+            key = day + clock_[:8]
+            if key != last_key:
+                base = journal_ts(mon, day, clock_[:8])
+                last_key = key
+            append(base + float(clock_[8:]) if len(clock_) > 8 else base)
+        return ts
+
+
+def parse_columns(text, kind="object", method=None, stock_only=True):
+    # Same lines as parse_journal, for callers that work on whole columns
+    matches = (proxy_pattern if kind == "proxy" else object_pattern).findall(text)
+    method_i = proxy_groups["method"]
+    oid_i = proxy_groups["oid"] if kind == "proxy" else object_groups["oid"]
+    if method is not None or stock_only:
+        matches = [m for m in matches if (method is None or m[method_i] == method) and (not stock_only or m[oid_i])]
+    return LogColumns(kind, matches)
+
+
+def parse_line(line):
+    m = object_pattern.match(line)
+    if m:
+        return object_records([m.groups()])[0]
+    m = proxy_pattern.match(line)
+    if m:
+        return proxy_records([m.groups()])[0]
+    return None
+
+
+def parse_journal(text, kind="object", method=None, stock_only=True):
+    # Whole chunk in one regex pass instead of splitting every line in Python
+    if kind == "proxy":
+        records = proxy_records(proxy_pattern.findall(text), method)
+    else:
+        records = object_records(object_pattern.findall(text), method)
+    if stock_only:
+        records = [record for record in records if record.oid >= 0]
+    return records
+
+
+def json_entry(text):
+    # One `journalctl -o json` entry as (cursor, short-precise line), so followed entries keep their position
+    try:
+        entry = json.loads(text)
+    except ValueError:
+        return None, None
+    message = entry.get("MESSAGE", "")
+    if isinstance(message, list):
+        message = bytes(message).decode(errors="replace")
+    dt = datetime.fromtimestamp(int(entry.get("__REALTIME_TIMESTAMP", 0)) / 1e6)
+    line = (f"{dt:%b %d %H:%M:%S.%f} {entry.get('_HOSTNAME', '-')} {entry.get('SYSLOG_IDENTIFIER', '-')}"
+            f"[{entry.get('_PID', 0)}]: {message}")
+    return entry.get("__CURSOR"), line
+
+
+def clock(ts):
+    return datetime.fromtimestamp(ts).strftime("%H:%M:%S.%f")[:-3]
+
+
+def synthetic_journal(n, kind):
+    lines = []
+    for i in range(n):
+        if kind == "proxy":
+            lines.append(f"Oct 18 12:{i // 60000 % 60:02d}:{i // 1000 % 60:02d} controller proxy-server[1000]: 192.168.1.100 "
+                         f"192.168.1.100 18/Oct/2026/12/00/00 PUT /v1/AUTH_admin/container-1/container-data-temp/"
+                         f"stock-data-{i}.json HTTP/1.0 201 - python-swiftclient gAAAAABl... 5195 - "
+                         f"acbc1bfe46b6bb8b67bde191e8d20798 tx0123456789abcdef01234-0065a - 0.0345 - - "
+                         f"{1697630400 + i // 1000}.{i % 1000:03d}000000 {1697630400 + i // 1000}.{i % 1000:03d}500000 0")
+        else:
+            lines.append(f"Oct 18 12:{i // 60000 % 60:02d}:{i // 1000 % 60:02d}.{i % 1000:03d}000 swift-object-1 object-server[2000]: "
+                         f"192.168.1.100 - - [18/Oct/2026:12:00:00 +0000] \"PUT /sdb/{i % 1024}/AUTH_admin/container-1/"
+                         f"container-data-temp/stock-data-{i}.json\" 201 - \"PUT http://192.168.1.100:8080/v1/AUTH_admin/"
+                         f"container-1/container-data-temp/stock-data-{i}.json\" \"tx0123456789abcdef01234-0065a\" "
+                         f"\"proxy-server 1000\" 0.0123 \"-\" 2000 0")
+    return "\n".join(lines)
+
+
+def as_timestamp(ts):
+    dt = datetime.now()
+    time_array = ts.split(":")
+    return datetime(dt.year, dt.month, dt.day, int(time_array[0]), int(time_array[1]), int(float(time_array[2])))
+
+
+def legacy_collect(text, kind):
+    # What the collectors used to do: split every line, pick fields by index, compare rebuilt datetimes
+    last_ts = None
+    total_bytes = 0
+    total_requests = 0
+    for entry in text.split("\n"):
+        if ("PUT /v1" if kind == "proxy" else "PUT /sdb") not in entry:
+            continue
+        request_array = entry.split()
+        ts = request_array[2]
+        if kind == "proxy":
+            object_url = request_array[9].split("/")[-1]
+            total_bytes += int(request_array[15])
+            float(request_array[20])
+        else:
+            object_url = request_array[11][:-1].split("/")[-1]
+            float(request_array[19])
+        if not object_url.startswith("stock-data"):
+            continue
+        int(re.split("[.-]", object_url)[2])
+        total_requests += 1
+        if last_ts is None or as_timestamp(ts) > as_timestamp(last_ts):
+            last_ts = ts
+    return total_requests
+
+
+def collect(text, kind):
+    columns = parse_columns(text, kind, method="PUT")
+    if len(columns):
+        max(columns.column("ts"))
+        sum(columns.column("bytes"))
+    return len(columns)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the log parser")
+    parser.add_argument("--lines", type=int, default=2000000)
+    args = parser.parse_args()
+
+    for kind in ["proxy", "object"]:
+        text = synthetic_journal(args.lines, kind)
+        start = time.time()
+        n_legacy = legacy_collect(text, kind)
+        legacy_elapsed = time.time() - start
+        start = time.time()
+        n_records = collect(text, kind)
+        elapsed = time.time() - start
+        print(f"{kind}: parse+aggregate {n_records} records in {round(elapsed, 3)} s ({round(n_records / elapsed)} lines/s), "
+              f"legacy {n_legacy} in {round(legacy_elapsed, 3)} s ({round(n_legacy / legacy_elapsed)} lines/s)")
@@ -0,0 +1,137 @@
+import threading
+import time
+from queue import Queue
+from prettytable import PrettyTable
+
+
+class StageCounter:
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.objects = 0
+        self.bytes = 0
+        self.errors = 0
+        self.blocked = 0.0
+        self.start_time = None
+        self.end_time = None
+
+    def start(self):
+        with self.lock:
+            if self.start_time is None:
+                self.start_time = time.time()
+
+    def add(self, nbytes, blocked=0.0):
+        with self.lock:
+            self.objects += 1
+            self.bytes += nbytes
+            self.blocked += blocked
+            self.end_time = time.time()
+
+    def error(self):
+        with self.lock:
+            self.errors += 1
+
+    def elapsed(self):
+        if self.start_time is None or self.end_time is None:
+            return 0.0
+        return self.end_time - self.start_time
+
+    def row(self):
+        elapsed = self.elapsed()
+        obj_rate = round(self.objects / elapsed, 1) if elapsed > 0 else 0
+        mb_rate = round(self.bytes / 1024.0 / 1024.0 / elapsed, 3) if elapsed > 0 else 0
+        return [self.name, self.objects, self.errors, round(elapsed, 3), obj_rate, mb_rate, round(self.blocked, 3)]
+
+
+class UploadPipeline:
+    def __init__(self, conn_factory, generator_factory, container, generator_workers=2,
+                 uploader_workers=8, queue_size=256, batch_size=100, seed=None, object_name=None, sizes=None):
+        self.conn_factory = conn_factory
+        self.generator_factory = generator_factory
+        self.container = container
+        self.object_name = object_name or (lambda oid: f"stock-data-{oid}.json")
+        # SizeIndex to record payload sizes in, movement stats have no source file to look them up
+        self.sizes = sizes
+        self.generator_workers = generator_workers
+        self.uploader_workers = uploader_workers
+        self.batch_size = batch_size
+        self.seed = seed
+        # Bounded so that generators block when uploads fall behind
+        self.q = Queue(maxsize=queue_size)
+        self.batches = Queue()
+        self.generated = StageCounter("generate")
+        self.uploaded = StageCounter("upload")
+        self.conn_error = None
+
+    def generate(self):
+        self.generated.start()
+        while True:
+            batch_range = self.batches.get()
+            if batch_range is None:
+                break
+            start_oid, n = batch_range
+            # Seed per batch so output does not depend on the number of workers
+            seed = None if self.seed is None else [self.seed, start_oid]
+            batch = self.generator_factory(seed).generate_batch(start_oid, n)
+            for i in range(len(batch)):
+                payload = batch.to_json(i).encode()
+                name = self.object_name(start_oid + i)
+                if self.sizes is not None:
+                    self.sizes.record(name.split("/")[-1], len(payload))
+                put_start = time.time()
+                self.q.put((name, payload))
+                self.generated.add(len(payload), blocked=time.time() - put_start)
+
+    def upload(self):
+        try:
+            conn = self.conn_factory()
+        except Exception as e:
+            # Keep draining so the generators never block on a full queue, every item counts as an error
+            conn = None
+            self.conn_error = e
+        self.uploaded.start()
+        while True:
+            get_start = time.time()
+            item = self.q.get()
+            if item is None:
+                break
+            blocked = time.time() - get_start
+            name, payload = item
+            if conn is None:
+                self.uploaded.error()
+                continue
+            try:
+                conn.put_object(self.container, name, payload)
+                self.uploaded.add(len(payload), blocked=blocked)
+            except Exception:
+                self.uploaded.error()
+
+    def run(self, start_oid, n):
+        if self.sizes is not None and self.sizes.sizes is None:
+            # Loaded once here rather than raced for by the generator threads
+            self.sizes.load()
+        self.conn_factory().put_container(self.container)
+        for oid in range(start_oid, start_oid + n, self.batch_size):
+            self.batches.put((oid, min(self.batch_size, start_oid + n - oid)))
+        for _ in range(self.generator_workers):
+            self.batches.put(None)
+
+        generators = [threading.Thread(target=self.generate) for _ in range(self.generator_workers)]
+        uploaders = [threading.Thread(target=self.upload) for _ in range(self.uploader_workers)]
+        for t in generators + uploaders:
+            t.start()
+        for t in generators:
+            t.join()
+        for _ in uploaders:
+            self.q.put(None)
+        for t in uploaders:
+            t.join()
+        if self.conn_error is not None:
+            print(f"Uploader could not connect: {self.conn_error}")
+
+    def __repr__(self):
+        # Blocked is time spent waiting on the queue: full for generators, empty for uploaders
+        t = PrettyTable(["Stage", "Objects", "Errors", "Elapsed (s)", "Objects/s", "MB/s", "Blocked (s)"])
+        t.add_row(self.generated.row())
+        t.add_row(self.uploaded.row())
+        return str(t)
@@ -0,0 +1,148 @@
+import array
+import configparser
+import gzip
+import hashlib
+import json
+import os
+import pickle
+import struct
+import sys
+import numpy as np
+from prettytable import PrettyTable
+
+
+class RingData:
+    # The parts of a Swift ring placement needs: devices, part shift and the replica -> partition -> device table
+    def __init__(self, devs, part_shift, replica2part2dev):
+        self.devs = devs
+        self.part_shift = part_shift
+        self.replica2part2dev = [np.asarray(row, dtype=np.int64) for row in replica2part2dev]
+
+    @property
+    def part_count(self):
+        return 1 << (32 - self.part_shift)
+
+    @property
+    def replicas(self):
+        return len(self.replica2part2dev)
+
+    @classmethod
+    def load(cls, fp):
+        fp = str(fp)
+        if fp.endswith(".builder"):
+            # Builder files are a pickled dict of builtins and arrays, no Swift classes needed
+            with open(fp, "rb") as f:
+                builder = pickle.load(f)
+            return cls(builder["devs"], 32 - builder["part_power"], builder["_replica2part2dev"] or [])
+        with gzip.open(fp, "rb") as f:
+            magic = f.read(4)
+            if magic != b"R1NG":
+                # Pre-2.x rings are a plain pickle
+                f.seek(0)
+                ring = pickle.load(f)
+                return cls(ring["devs"], ring["part_shift"], ring["replica2part2dev_id"])
+            version, = struct.unpack("!H", f.read(2))
+            if version != 1:
+                raise ValueError(f"Unsupported ring format version {version} in {fp}")
+            json_len, = struct.unpack("!I", f.read(4))
+            ring = json.loads(f.read(json_len))
+            typecode = "I" if ring.get("dev_id_bytes", 2) == 4 else "H"
+            part_count = 1 << (32 - ring["part_shift"])
+            rows = []
+            for _ in range(ring["replica_count"]):
+                row = array.array(typecode)
+                row.frombytes(f.read(row.itemsize * part_count))
+                if ring.get("byteorder", sys.byteorder) != sys.byteorder:
+                    row.byteswap()
+                rows.append(row)
+            return cls(ring["devs"], ring["part_shift"], rows)
+
+    def save(self, fp):
+        # Same on-disk format swift-ring-builder writes, so the real servers can load it
+        ring = {"devs": self.devs, "part_shift": self.part_shift, "replica_count": self.replicas,
+                "byteorder": sys.byteorder}
+        header = json.dumps(ring).encode()
+        with gzip.open(str(fp), "wb") as f:
+            f.write(b"R1NG" + struct.pack("!H", 1) + struct.pack("!I", len(header)) + header)
+            for row in self.replica2part2dev:
+                f.write(array.array("H", row.tolist()).tobytes())
+
+
+def hash_path_affixes(fp="/etc/swift/swift.conf"):
+    # swift_hash_path_prefix / suffix salt every object hash, they must match the cluster's swift.conf
+    conf = configparser.ConfigParser()
+    conf.read(fp)
+    return (conf.get("swift-hash", "swift_hash_path_prefix", fallback="").encode(),
+            conf.get("swift-hash", "swift_hash_path_suffix", fallback="").encode())
+
+
+class Placement:
+    # Answers "which nodes hold this object" with the proxy's own hashing, so nothing is read from the nodes
+    def __init__(self, ring, account, container="container-1", prefix=b"", suffix=b""):
+        self.ring = ring
+        self.account = account
+        self.container = container
+        self.prefix = prefix
+        self.suffix = suffix
+        self.dev_ips = np.array([dev.get("ip", "") if dev else "" for dev in ring.devs] + [""], dtype=object)
+
+    @classmethod
+    def from_file(cls, fp, account, container="container-1", conf="/etc/swift/swift.conf"):
+        prefix, suffix = hash_path_affixes(conf) if os.path.exists(conf) else (b"", b"")
+        return cls(RingData.load(fp), account, container, prefix, suffix)
+
+    def partitions(self, names):
+        base = self.prefix + f"/{self.account}/{self.container}/".encode()
+        digests = b"".join(hashlib.md5(base + name.encode() + self.suffix).digest()[:4] for name in names)
+        return np.frombuffer(digests, dtype=">u4").astype(np.int64) >> self.ring.part_shift
+
+    def partition(self, name):
+        return int(self.partitions([name])[0])
+
+    def devices(self, parts):
+        # replicas x len(parts) device ids, -1 where a fractional replica has no row for the partition
+        parts = np.asarray(parts, dtype=np.int64)
+        rows = []
+        for row in self.ring.replica2part2dev:
+            rows.append(np.where(parts < len(row), row[np.minimum(parts, len(row) - 1)], -1))
+        return np.vstack(rows) if rows else np.empty((0, len(parts)), dtype=np.int64)
+
+    def nodes(self, name):
+        ips = []
+        for dev in self.devices([self.partition(name)])[:, 0].tolist():
+            ip = self.dev_ips[dev]
+            if ip and ip not in ips:
+                ips.append(ip)
+        return ips
+
+    def locate(self, names):
+        # node ip per replica for every name, as a replicas x len(names) array
+        return self.dev_ips[self.devices(self.partitions(names))]
+
+    def on_node(self, ip, names, keys=None):
+        # Names (or their keys) that have a replica on `ip`
+        node_devs = [dev for dev, dev_ip in enumerate(self.dev_ips.tolist()) if dev_ip == ip]
+        held = np.isin(self.devices(self.partitions(names)), node_devs).any(axis=0)
+        keys = names if keys is None else keys
+        return [key for key, h in zip(keys, held.tolist()) if h]
+
+    def device_counts(self, devs):
+        # Replicas per node, counted on device ids so millions of names stay in numpy
+        devs = np.asarray(devs).ravel()
+        per_dev = np.bincount(devs[devs >= 0], minlength=len(self.ring.devs))
+        counts = {}
+        for dev, c in enumerate(per_dev.tolist()):
+            ip = self.dev_ips[dev]
+            if ip and c:
+                counts[ip] = counts.get(ip, 0) + c
+        return counts
+
+    def counts(self, names):
+        return self.device_counts(self.devices(self.partitions(names)))
+
+
+def counts_table(counts):
+    t = PrettyTable(["Node IP", "Num Objects"])
+    for ip in sorted(counts):
+        t.add_row([ip, counts[ip]])
+    return t
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import deque
+from prettytable import PrettyTable
+from histogram import LatencyHistogram
+
+
+class RampStep:
+    __slots__ = ["index", "weights", "expected", "requests", "bytes", "kbps", "get", "put", "probe_errors", "elapsed",
+                 "status"]
+
+    def __init__(self, index, weights, expected=None):
+        self.index = index
+        self.weights = weights
+        self.expected = expected
+        self.requests = 0
+        self.bytes = 0
+        self.kbps = 0.0
+        self.get = LatencyHistogram()
+        self.put = LatencyHistogram()
+        self.probe_errors = 0
+        self.elapsed = 0.0
+        self.status = "running"
+
+
+class WeightRamp:
+    # Moves node weights toward their targets in `steps` rebalances instead of one. After each step it follows the
+    # replication PUTs and probes foreground GET/PUT latency, and only moves on once the step's movement has settled
+    # (the predicted number of PUTs arrived, or none for `settle` seconds after the first one) and the probes in the
+    # last `settle` seconds are all under `latency_limit`. A step that does not get there within `step_timeout` holds the ramp
+    def __init__(self, cluster, current, targets, apply, probe, expected=None, steps=4, latency_limit=0.5,
+                 settle=5.0, step_timeout=300, poll=1.0):
+        self.cluster = cluster
+        self.current = dict(current)
+        self.targets = dict(targets)
+        self.apply = apply
+        self.probe = probe
+        self.expected = expected
+        self.steps = max(1, int(steps))
+        self.latency_limit = latency_limit
+        self.settle = settle
+        self.step_timeout = step_timeout
+        self.poll = poll
+        self.results = []
+
+    def weights_at(self, k):
+        return {ip: round(self.current[ip] + (target - self.current[ip]) * k / self.steps, 3)
+                for ip, target in self.targets.items()}
+
+    def watch(self, step):
+        stop = threading.Event()
+        collector = threading.Thread(target=self.cluster.get_put_requests,
+                                     kwargs={"deadline": self.step_timeout, "verbose": False, "stop": stop})
+        collector.daemon = True
+        collector.start()
+        recent = deque()
+        start = last_change = time.time()
+        try:
+            while True:
+                try:
+                    get_latency, put_latency = self.probe()
+                    step.get.record(get_latency)
+                    step.put.record(put_latency)
+                    latency = max(get_latency, put_latency)
+                except Exception:
+                    # A probe that fails is a breach of the latency limit, not the end of the ramp
+                    step.probe_errors += 1
+                    latency = float("inf")
+                now = time.time()
+                recent.append((now, latency))
+                while recent and recent[0][0] < now - self.settle:
+                    recent.popleft()
+                aggregator = self.cluster.aggregator
+                requests = aggregator.requests if aggregator is not None else 0
+                if requests != step.requests:
+                    step.requests = requests
+                    last_change = now
+                # With a prediction, quiet only counts once replication has started: the replicator can take a
+                # whole pass (30 s by default) before the first PUT of a step arrives
+                quiet = now - last_change >= self.settle and (step.expected is None or requests > 0)
+                settled = (step.expected is not None and requests >= step.expected) or quiet
+                latency_ok = max(latency for _, latency in recent) <= self.latency_limit
+                if settled and latency_ok:
+                    step.status = "settled"
+                    break
+                if now - start >= self.step_timeout:
+                    step.status = "latency over limit" if settled else "movement not settled"
+                    break
+                stop.wait(self.poll)
+        finally:
+            stop.set()
+            collector.join()
+            aggregator = self.cluster.finish_collection()
+        if aggregator is not None:
+            stats = aggregator.snapshot()
+            step.requests, step.bytes, step.kbps = stats["requests"], stats["bytes"], stats["kbps"]
+        step.elapsed = time.time() - start
+        return step
+
+    def run(self):
+        for k in range(1, self.steps + 1):
+            weights = self.weights_at(k)
+            step = RampStep(k, weights, self.expected(weights) if self.expected is not None else None)
+            self.apply(weights)
+            self.results.append(self.watch(step))
+            print(self.table([step]))
+            if step.status != "settled":
+                print(f"Ramp held at step {k}/{self.steps}: {step.status}")
+                return False
+        return True
+
+    def table(self, steps=None):
+        t = PrettyTable(["Step", "Weights", "Expected PUTs", "PUTs", "KB", "KB/s", "GET p99 (s)", "PUT p99 (s)",
+                         "Probe Errors", "Time (s)", "Status"])
+        for step in self.results if steps is None else steps:
+            t.add_row([f"{step.index}/{self.steps}", ", ".join(f"{ip}={w}" for ip, w in sorted(step.weights.items())),
+                       step.expected if step.expected is not None else "-", step.requests,
+                       round(step.bytes / 1024.0, 3), round(step.kbps, 3), round(step.get.percentile(99), 4),
+                       round(step.put.percentile(99), 4), step.probe_errors, round(step.elapsed, 3), step.status])
+        return t
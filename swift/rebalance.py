@@ -0,0 +1,139 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import numpy as np
+from prettytable import PrettyTable
+from placement import RingData
+from ringbuilder import RingBuilder
+
+
+def parse_changes(text):
+    # "weight 192.168.1.99 50; add 192.168.1.90 100; remove 192.168.1.95"
+    changes = []
+    for entry in text.split(";"):
+        words = entry.split()
+        if not words:
+            continue
+        if words[0] in ["weight", "set_weight"] and len(words) == 3:
+            changes.append(("set_weight", words[1], float(words[2])))
+        elif words[0] == "add" and len(words) in [2, 3]:
+            changes.append(("add", words[1], float(words[2]) if len(words) == 3 else 100.0))
+        elif words[0] == "remove" and len(words) == 2:
+            changes.append(("remove", words[1]))
+        else:
+            raise ValueError(f"Bad ring change: {entry.strip()}")
+    return changes
+
+
+def next_zone(devs):
+    return max([dev["zone"] for dev in devs if dev] + [0]) + 1
+
+
+def builder_commands(builder_fp, changes, devs):
+    # swift-ring-builder invocations that apply the changes, same arguments StorageCluster uses
+    zone = next_zone(devs)
+    commands = []
+    for change in changes:
+        if change[0] == "set_weight":
+            commands.append(["swift-ring-builder", builder_fp, "set_weight", change[1], str(change[2])])
+        elif change[0] == "add":
+            commands.append(["swift-ring-builder", builder_fp, "add", "--region", "10", "--zone", f"{zone}",
+                             "--ip", change[1], "--port", "6200", "--device", "sdb", "--weight", str(change[2])])
+            zone += 1
+        elif change[0] == "remove":
+            commands.append(["swift-ring-builder", builder_fp, "remove", change[1]])
+    return commands
+
+
+def apply_changes(builder, changes):
+    zone = next_zone(builder.devs)
+    for change in changes:
+        if change[0] == "set_weight":
+            builder.set_weight(change[1], change[2])
+        elif change[0] == "add":
+            builder.add_dev(change[1], zone, change[2])
+            zone += 1
+        elif change[0] == "remove":
+            builder.remove_dev(change[1])
+    return builder
+
+
+class RebalanceSimulator:
+    # Dry run of a ring change: rebalance a copy and diff partition assignments against the current ring
+    def __init__(self, builder_fp=None, ring=None):
+        self.builder_fp = builder_fp
+        self.ring = ring if ring is not None else RingData.load(builder_fp)
+
+    def simulate(self, changes):
+        if self.builder_fp is None:
+            # No builder file (local cluster), use the in-process builder on the loaded ring
+            builder = apply_changes(RingBuilder.from_ring(self.ring), changes)
+            builder.rebalance()
+            return builder.get_ring()
+        tmp = tempfile.mkdtemp(prefix="ring-sim-")
+        try:
+            fp = os.path.join(tmp, "object.builder")
+            shutil.copy(self.builder_fp, fp)
+            for args in builder_commands(fp, changes, self.ring.devs):
+                subprocess.run(args, stdout=subprocess.DEVNULL, check=True)
+            # min_part_hours would hold back moves the real rebalance is going to make eventually.
+            # Exit status 1 is only a warning, the builder is still written
+            for command in ["pretend_min_part_hours_passed", "rebalance"]:
+                if subprocess.run(["swift-ring-builder", fp, command], stdout=subprocess.DEVNULL).returncode > 1:
+                    raise RuntimeError(f"swift-ring-builder {command} failed for the simulated ring")
+            return RingData.load(fp)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+class MovementPlan:
+    # Part-replica slots that change device between two rings, weighted by the objects in each partition
+    def __init__(self, old, new, parts=None, sizes=None):
+        self.old = old
+        self.new = new
+        part_count = old.part_count
+        parts = np.asarray(parts if parts is not None else [], dtype=np.int64)
+        sizes = np.asarray(sizes if sizes is not None else np.zeros(len(parts)), dtype=np.float64)
+        self.part_objects = np.bincount(parts, minlength=part_count)
+        self.part_bytes = np.bincount(parts, weights=sizes, minlength=part_count)
+        self.moves = {}
+        # Replicas of each partition that change device, i.e. replication PUTs per object in it
+        self.part_moves = np.zeros(part_count, dtype=np.int64)
+        for r in range(min(old.replicas, new.replicas)):
+            old_row, new_row = old.replica2part2dev[r], new.replica2part2dev[r]
+            n = min(len(old_row), len(new_row))
+            changed = np.nonzero(old_row[:n] != new_row[:n])[0]
+            self.part_moves[changed] += 1
+            for src, dst, p in zip(old_row[changed].tolist(), new_row[changed].tolist(), changed.tolist()):
+                key = (self.ip(old, src), self.ip(new, dst))
+                entry = self.moves.setdefault(key, [0, 0, 0.0])
+                entry[0] += 1
+                entry[1] += int(self.part_objects[p])
+                entry[2] += float(self.part_bytes[p])
+        self.partitions = int((self.part_moves > 0).sum())
+
+    @staticmethod
+    def ip(ring, dev_id):
+        dev = ring.devs[dev_id] if 0 <= dev_id < len(ring.devs) else None
+        return dev["ip"] if dev else "-"
+
+    def object_moves(self, parts, keys):
+        # key -> replicas that move, for the objects in `parts` that move at all
+        counts = self.part_moves[np.asarray(parts, dtype=np.int64)]
+        return {key: n for key, n in zip(keys, counts.tolist()) if n}
+
+    def total_bytes(self):
+        return sum(entry[2] for entry in self.moves.values())
+
+    def total_objects(self):
+        return sum(entry[1] for entry in self.moves.values())
+
+    def table(self, kbps):
+        t = PrettyTable(["Source", "Destination", "Part Replicas", "Objects", "KB", "Est. Time (s)"])
+        for (src, dst), (slots, objects, nbytes) in sorted(self.moves.items()):
+            t.add_row([src, dst, slots, objects, round(nbytes / 1024.0, 3), round(nbytes / 1024.0 / kbps, 3)])
+        total = self.total_bytes()
+        t.add_row(["total", "", sum(entry[0] for entry in self.moves.values()), self.total_objects(),
+                   round(total / 1024.0, 3), round(total / 1024.0 / kbps, 3)])
+        return t
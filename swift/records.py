@@ -0,0 +1,199 @@
+import threading
+import time
+from queue import Queue
+import numpy as np
+from histogram import LatencyHistogram
+from timeseries import ThroughputSeries
+
+record_dtype = [("ts", np.float64), ("oid", np.int64), ("size", np.int64), ("latency", np.float64), ("node", np.int16)]
+
+
+class RecordBatch:
+    __slots__ = ["node", "ts", "oid", "size", "latency"]
+
+    def __init__(self, node):
+        self.node = node
+        self.ts = []
+        self.oid = []
+        self.size = []
+        self.latency = []
+
+    def append(self, ts, oid, size, latency):
+        self.ts.append(ts)
+        self.oid.append(oid)
+        self.size.append(size)
+        self.latency.append(latency)
+
+    def __len__(self):
+        return len(self.ts)
+
+
+class RecordStore:
+    # Append-only columns, grown by doubling; collectors hand over whole batches so the lock is taken once per batch
+    def __init__(self, capacity=4096):
+        self.columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in record_dtype}
+        self.n = 0
+        self.nodes = []
+        self.node_codes = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.n
+
+    def node_code(self, name):
+        code = self.node_codes.get(name)
+        if code is None:
+            code = self.node_codes[name] = len(self.nodes)
+            self.nodes.append(name)
+        return code
+
+    def reserve(self, n):
+        capacity = len(self.columns["ts"])
+        if n <= capacity:
+            return
+        while capacity < n:
+            capacity *= 2
+        for name, column in self.columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.n] = column[:self.n]
+            self.columns[name] = grown
+
+    def extend(self, batch):
+        n = len(batch)
+        if n == 0:
+            return
+        with self.lock:
+            self.reserve(self.n + n)
+            end = self.n + n
+            self.columns["ts"][self.n:end] = batch.ts
+            self.columns["oid"][self.n:end] = batch.oid
+            self.columns["size"][self.n:end] = batch.size
+            self.columns["latency"][self.n:end] = batch.latency
+            self.columns["node"][self.n:end] = self.node_code(batch.node)
+            self.n = end
+
+    def column(self, name):
+        return self.columns[name][:self.n]
+
+    def clear(self):
+        with self.lock:
+            self.n = 0
+
+    def in_range(self, lo, hi):
+        oid = self.column("oid")
+        return (oid >= lo) & (oid < hi)
+
+    def summary(self, mask=None):
+        size = self.column("size")
+        ts = self.column("ts")
+        latency = self.column("latency")
+        if mask is not None:
+            size, ts, latency = size[mask], ts[mask], latency[mask]
+        if len(ts) == 0:
+            return {"requests": 0, "bytes": 0, "last_ts": None, "response_time": 0.0}
+        return {"requests": len(ts), "bytes": int(size.sum()), "last_ts": float(ts.max()),
+                "response_time": float(latency.sum())}
+
+    def by_node(self, mask=None):
+        node = self.column("node")
+        for code, name in enumerate(self.nodes):
+            selected = node == code
+            if mask is not None:
+                selected &= mask
+            if selected.any():
+                yield name, selected
+
+    def latency_histograms(self, mask=None):
+        histograms = {}
+        latency = self.column("latency")
+        for name, selected in self.by_node(mask):
+            histograms[name] = LatencyHistogram()
+            histograms[name].record_array(latency[selected])
+        return histograms
+
+    def series(self, start, interval=0.1, mask=None):
+        series = ThroughputSeries(start, interval)
+        ts = self.column("ts")
+        size = self.column("size")
+        for name, selected in self.by_node(mask):
+            series.record_array(ts[selected], size[selected], name)
+        return series
+
+
+class LiveAggregator:
+    # Readers put batches on a bounded queue and one consumer folds them into the store and the
+    # running stats, so aggregation keeps up with collection instead of starting after it.
+    # `store` is optional, pass one only if the raw records are needed afterwards
+    def __init__(self, store, start, queue_size=64, interval=0.1):
+        self.store = store
+        self.q = Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.series = ThroughputSeries(start if start is not None else time.time(), interval)
+        self.latencies = {}
+        self.requests = 0
+        self.bytes = 0
+        self.response_time = 0.0
+        self.last_ts = None
+        self.batches = 0
+        self.blocked = 0.0
+        self.start_time = time.time()
+        self.thread = None
+        self.error = None
+
+    def extend(self, batch):
+        # Same interface as RecordStore.extend so readers can write to either
+        if len(batch) == 0:
+            return
+        put_start = time.time()
+        self.q.put(batch)
+        with self.lock:
+            self.blocked += time.time() - put_start
+
+    def consume(self, batch):
+        if self.store is not None:
+            self.store.extend(batch)
+        ts = np.asarray(batch.ts, dtype=np.float64)
+        size = np.asarray(batch.size, dtype=np.int64)
+        latency = np.asarray(batch.latency, dtype=np.float64)
+        with self.lock:
+            self.series.record_array(ts, size, batch.node)
+            self.latencies.setdefault(batch.node, LatencyHistogram()).record_array(latency)
+            self.requests += len(ts)
+            self.bytes += int(size.sum())
+            self.response_time += float(latency.sum())
+            self.last_ts = max(self.last_ts or 0.0, float(ts.max()))
+            self.batches += 1
+
+    def run(self):
+        while True:
+            batch = self.q.get()
+            if batch is None:
+                break
+            try:
+                self.consume(batch)
+            except Exception as e:
+                # Keep draining so readers never block on a full queue, the first error is reported by finish()
+                if self.error is None:
+                    self.error = e
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def finish(self):
+        self.q.put(None)
+        self.thread.join()
+        return self.error
+
+    def snapshot(self):
+        with self.lock:
+            elapsed = time.time() - self.start_time
+            merged = LatencyHistogram()
+            for hist in self.latencies.values():
+                merged.merge(hist)
+            return {"elapsed": elapsed, "requests": self.requests, "bytes": self.bytes,
+                    "kbps": self.bytes / 1024.0 / elapsed if elapsed > 0 else 0.0,
+                    "p50": merged.percentile(50), "p99": merged.percentile(99),
+                    "queued": self.q.qsize(), "blocked": self.blocked}
@@ -0,0 +1,102 @@
+import numpy as np
+from placement import RingData
+
+
+class RingBuilder:
+    # Small in-process stand-in for swift-ring-builder: weight-proportional part-replica counts, one replica
+    # of a partition per device, other zones preferred, and only the slots that have to move are reassigned
+    def __init__(self, part_power, replicas, devs=None, replica2part2dev=None, seed=0):
+        self.part_power = part_power
+        self.replicas = replicas
+        self.devs = [dict(dev) if dev else None for dev in devs or []]
+        parts = 1 << part_power
+        if replica2part2dev is None:
+            self.assignment = np.full((replicas, parts), -1, dtype=np.int64)
+        else:
+            self.assignment = np.vstack([np.asarray(row, dtype=np.int64) for row in replica2part2dev])
+        self.removed = set()
+        self.rng = np.random.RandomState(seed)
+
+    @classmethod
+    def from_ring(cls, ring, seed=0):
+        return cls(32 - ring.part_shift, ring.replicas, ring.devs, ring.replica2part2dev, seed=seed)
+
+    def copy(self):
+        builder = RingBuilder(self.part_power, self.replicas, self.devs, self.assignment, seed=0)
+        builder.removed = set(self.removed)
+        return builder
+
+    def find(self, ip):
+        return [dev["id"] for dev in self.devs if dev and dev["ip"] == ip]
+
+    def add_dev(self, ip, zone, weight=100, region=10, port=6200, device="sdb"):
+        dev_id = len(self.devs)
+        self.devs.append({"id": dev_id, "region": region, "zone": zone, "ip": ip, "port": port,
+                          "device": device, "weight": float(weight)})
+        return dev_id
+
+    def set_weight(self, ip, weight):
+        dev_ids = self.find(ip)
+        if not dev_ids:
+            raise ValueError(f"No device for {ip} in the ring")
+        for dev_id in dev_ids:
+            self.devs[dev_id]["weight"] = float(weight)
+
+    def remove_dev(self, ip):
+        dev_ids = self.find(ip)
+        if not dev_ids:
+            raise ValueError(f"No device for {ip} in the ring")
+        for dev_id in dev_ids:
+            self.devs[dev_id]["weight"] = 0.0
+            self.removed.add(dev_id)
+
+    def targets(self):
+        # Integer part-replica count per device, largest remainders get the rounding
+        weights = np.array([dev["weight"] if dev and dev["id"] not in self.removed else 0.0 for dev in self.devs])
+        if weights.sum() <= 0:
+            raise ValueError("Ring has no weighted devices")
+        total = self.assignment.size
+        share = weights / weights.sum() * total
+        target = np.floor(share).astype(np.int64)
+        order = np.argsort(-(share - target), kind="stable")
+        target[order[:total - target.sum()]] += 1
+        return target
+
+    def rebalance(self):
+        target = self.targets()
+        n = len(self.devs)
+        counts = np.bincount(self.assignment[self.assignment >= 0], minlength=n)
+        moved = 0
+        # Free slots on removed devices and on devices over their target
+        for dev_id in range(n):
+            excess = counts[dev_id] - target[dev_id]
+            if excess <= 0:
+                continue
+            slots = np.argwhere(self.assignment == dev_id)
+            for r, p in slots[self.rng.permutation(len(slots))[:excess]]:
+                self.assignment[r, p] = -1
+            counts[dev_id] -= excess
+        zones = np.array([dev["zone"] if dev else -1 for dev in self.devs])
+        for r, p in np.argwhere(self.assignment < 0):
+            holders = self.assignment[:, p]
+            holders = holders[holders >= 0]
+            deficit = (target - counts).astype(np.float64)
+            deficit[holders] = -np.inf
+            deficit[[dev_id for dev_id in self.removed if dev_id < n]] = -np.inf
+            # Another zone if one still has room, otherwise any device not already holding the partition
+            other_zone = deficit.copy()
+            other_zone[np.isin(zones, zones[holders])] = -np.inf
+            choice = other_zone if other_zone.max() > 0 else deficit
+            if choice.max() == -np.inf:
+                raise ValueError(f"Not enough devices for {self.replicas} replicas")
+            dev_id = int(np.argmax(choice))
+            self.assignment[r, p] = dev_id
+            counts[dev_id] += 1
+            moved += 1
+        for dev_id in self.removed:
+            self.devs[dev_id] = None
+        self.removed = set()
+        return moved
+
+    def get_ring(self):
+        return RingData(self.devs, 32 - self.part_power, list(self.assignment))
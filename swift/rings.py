@@ -0,0 +1,115 @@
+import hashlib
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from prettytable import PrettyTable
+from fanout import FanOut
+from transport import transport
+
+ring_ports = {"account": 6202, "container": 6201, "object": 6200}
+
+
+def ring_devices(conf, port):
+    # One sdb device per configured host, a zone each, with the host's configured weight
+    weights = conf.get("weights") or [100] * len(conf.get("hosts"))
+    return [{"region": 10, "zone": i + 1, "ip": ip, "port": port, "replication_ip": ip, "replication_port": port,
+             "device": "sdb", "weight": float(weight), "meta": ""}
+            for i, (ip, weight) in enumerate(zip(conf.get("hosts"), weights))]
+
+
+def build_ring(name, conf, swift_dir="/etc/swift", part_power=10, min_part_hours=0):
+    # In-process with Swift's own builder when it is importable, otherwise three swift-ring-builder calls
+    # (create, one batched add for every device, rebalance) instead of one per device
+    builder_fp = os.path.join(swift_dir, f"{name}.builder")
+    ring_fp = os.path.join(swift_dir, f"{name}.ring.gz")
+    devs = ring_devices(conf, ring_ports[name])
+    try:
+        from swift.common.ring import RingBuilder as SwiftRingBuilder
+    except ImportError:
+        SwiftRingBuilder = None
+    if SwiftRingBuilder is not None:
+        builder = SwiftRingBuilder(part_power, conf.get("replicas"), min_part_hours)
+        for dev in devs:
+            builder.add_dev(dev)
+        builder.rebalance()
+        builder.save(builder_fp)
+        builder.get_ring().save(ring_fp)
+        return ring_fp
+    subprocess.run(["swift-ring-builder", builder_fp, "create", str(part_power), str(conf.get("replicas")),
+                    str(min_part_hours)], stdout=subprocess.DEVNULL, check=True)
+    add = ["swift-ring-builder", builder_fp, "add"]
+    for dev in devs:
+        add += [f"r{dev['region']}z{dev['zone']}-{dev['ip']}:{dev['port']}/{dev['device']}", str(dev["weight"])]
+    subprocess.run(add, stdout=subprocess.DEVNULL, check=True)
+    # Exit status 1 is a rebalance warning (e.g. balance not perfect), the ring is still written
+    if subprocess.run(["swift-ring-builder", builder_fp, "rebalance"], stdout=subprocess.DEVNULL).returncode > 1:
+        raise RuntimeError(f"swift-ring-builder rebalance failed for {name}")
+    return ring_fp
+
+
+def build_rings(ring_conf, swift_dir="/etc/swift"):
+    # The three rings are independent, build them side by side
+    with ThreadPoolExecutor(max_workers=len(ring_ports)) as executor:
+        futures = {name: executor.submit(build_ring, name, ring_conf.get(name), swift_dir) for name in ring_ports}
+    return {name: future.result() for name, future in futures.items()}
+
+
+def file_md5(fp):
+    md5 = hashlib.md5()
+    with open(fp, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+class RingPush:
+    # Every host gets its rings in one scp over its shared ssh session, all hosts at once, then one md5sum
+    # per host checks what landed; a host whose checksums do not match is pushed again
+    def __init__(self, ring_files, hosts, dst="/etc/swift", retries=1, timeout=30, budget=120):
+        self.ring_files = ring_files
+        self.hosts = hosts
+        self.dst = dst
+        self.retries = retries
+        self.timeout = timeout
+        self.budget = budget
+        self.checksums = {name: file_md5(fp) for name, fp in ring_files.items()}
+        self.results = []
+
+    def remote_checksums(self, ip, names, timeout):
+        paths = " ".join(f"{self.dst}/{os.path.basename(self.ring_files[name])}" for name in names)
+        out = transport.run(ip, f"md5sum {paths}", hide=True, warn=True, timeout=timeout).stdout
+        sums = {os.path.basename(line.split()[1]): line.split()[0] for line in out.splitlines() if len(line.split()) == 2}
+        return {name: sums.get(os.path.basename(self.ring_files[name])) for name in names}
+
+    def push_host(self, ip, timeout):
+        names = sorted(self.hosts[ip])
+        bad = names
+        for _ in range(self.retries + 1):
+            src = [self.ring_files[name] for name in bad]
+            transport.scp(src, ip, self.dst, timeout=timeout)
+            remote = self.remote_checksums(ip, bad, timeout)
+            bad = [name for name in bad if remote[name] != self.checksums[name]]
+            if not bad:
+                return names
+        raise RuntimeError(f"checksum mismatch: {', '.join(bad)}")
+
+    def run(self):
+        fanout = FanOut(timeout=self.timeout, budget=self.budget)
+        self.results = fanout.run(self.push_host, sorted(self.hosts))
+        fanout.report()
+        return self.results
+
+    def table(self):
+        t = PrettyTable(["Host", "Rings", "Status", "Time (s)"])
+        for r in self.results:
+            t.add_row([r.node, ", ".join(sorted(self.hosts[r.node])), "verified" if r.ok else r.error, round(r.elapsed, 3)])
+        return t
+
+
+def ring_hosts(ring_conf):
+    # Host -> names of the rings it serves
+    hosts = {}
+    for name in ring_ports:
+        for ip in ring_conf.get(name).get("hosts"):
+            hosts.setdefault(ip, set()).add(name)
+    return hosts
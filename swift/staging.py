@@ -0,0 +1,111 @@
+import os
+import csv
+import shutil
+from pathlib import Path
+
+
+def _copy_file_range(fsrc, fdst, size):
+    copied = 0
+    while copied < size:
+        n = os.copy_file_range(fsrc, fdst, size - copied)
+        if n == 0:
+            break
+        copied += n
+
+
+def _sendfile(fsrc, fdst, size):
+    copied = 0
+    while copied < size:
+        n = os.sendfile(fdst, fsrc, copied, size - copied)
+        if n == 0:
+            break
+        copied += n
+
+
+def copy_file(src, dst):
+    # Kernel side copy, falling back to sendfile and finally a userspace copy
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        for method in [getattr(os, "copy_file_range", None) and _copy_file_range,
+                       getattr(os, "sendfile", None) and _sendfile]:
+            if not method:
+                continue
+            try:
+                method(fsrc.fileno(), fdst.fileno(), size)
+                return
+            except OSError:
+                fsrc.seek(0)
+                fdst.seek(0)
+                fdst.truncate()
+        shutil.copyfileobj(fsrc, fdst)
+
+
+def stage_file(src, dst, link=True):
+    # Never write through an old hardlink into the source file
+    if os.path.lexists(dst):
+        os.unlink(dst)
+    if link:
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            # Cross device or unsupported filesystem
+            pass
+    copy_file(src, dst)
+
+
+def stage_objects(oids, src_dir="container-data", dst_dir="container-data-temp", link=True):
+    dst_dir = Path(dst_dir)
+    dst_dir.mkdir(parents=True, exist_ok=True)
+    for oid in oids:
+        name = f"stock-data-{oid}.json"
+        stage_file(Path(src_dir) / name, dst_dir / name, link=link)
+
+
+def object_paths(oids, src_dir="container-data"):
+    return [str(Path(src_dir) / f"stock-data-{oid}.json") for oid in oids]
+
+
+class SizeIndex:
+    def __init__(self, src_dir="container-data"):
+        self.src_dir = Path(src_dir)
+        self.sizes = None
+        self.misses = 0
+
+    def load(self):
+        # Datagen manifest if there is one, otherwise a single scandir pass
+        sizes = {}
+        manifest = self.src_dir / "manifest.csv"
+        if manifest.exists():
+            with open(manifest, newline="") as f:
+                for row in csv.DictReader(f):
+                    sizes[Path(row["path"]).name] = int(row["size"])
+        elif self.src_dir.is_dir():
+            with os.scandir(self.src_dir) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        sizes[entry.name] = entry.stat().st_size
+        self.sizes = sizes
+        return self
+
+    def record(self, name, size):
+        # Objects uploaded straight from memory have no file to stat
+        if self.sizes is None:
+            self.load()
+        self.sizes[name] = size
+
+    def get(self, name, size=0):
+        # Content length from the log line wins when the server reported one
+        if size > 0:
+            return size
+        if self.sizes is None:
+            self.load()
+        object_size = self.sizes.get(name)
+        if object_size is None:
+            self.misses += 1
+            try:
+                object_size = os.stat(self.src_dir / name).st_size
+            except OSError:
+                object_size = 0
+            self.sizes[name] = object_size
+        return object_size
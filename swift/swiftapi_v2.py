@@ -9,9 +9,25 @@ import re
 import time
 from tqdm import tqdm
 import os
-from fabric import Connection
 import threading
 from queue import Queue
+import numpy as np
+from pipeline import UploadPipeline
+from staging import stage_objects, object_paths, SizeIndex
+from swifthttp import SwiftHTTPClient
+from uploader import UploadEngine
+from loadgen import ReadLoadGenerator, OpenLoopGenerator, Workload, key_chooser
+from fakeswift import FakeSwiftCluster
+from histogram import LatencyHistogram, latency_table
+from records import RecordStore, RecordBatch, LiveAggregator
+from fanout import FanOut
+from transport import transport
+from placement import Placement, RingData, counts_table
+from rebalance import RebalanceSimulator, MovementPlan, parse_changes
+from ringbuilder import RingBuilder
+from rings import build_rings, ring_devices, ring_hosts, ring_ports, RingPush
+from ramp import WeightRamp
+from logparse import parse_journal, parse_columns, parse_line, json_entry, clock
 
 vm_mapping = {
     "192.168.1.99": "192.168.1.71",
@@ -31,17 +47,13 @@ vm_numbers = {
     "192.168.1.94": 6
 }
 
-def moving_average(array, interval):
-    if len(array) < interval:
-        return sum(array) / len(array)
-    else:
-        return sum(array[-interval:]) / interval
-
 class StockData:
-    def __init__(self):
+    def __init__(self, seed=None):
         self.sectors = ["communication", "energy", "materials", "industrials", "utilities",
                "healthcare", "financials", "consumer discretionary", "consumer staples",
                "infotech", "real estate"]
+        self.n_ticks = 20
+        self.rng = np.random.default_rng(seed)
         
     def generate(self, oid):
         # Starting variables
@@ -72,6 +84,75 @@ class StockData:
             })
             cur_price *= (1.0 + increase_factor)
         return data
+    
+    def generate_batch(self, start_oid, n):
+        # Starting variables for every object at once
+        start_price = self.rng.random(n) * self.rng.integers(5, 3001, n)
+        reviews = self.rng.integers(5, 1001, n)
+        positive_reviews = self.rng.integers(1, reviews + 1)
+        avg_volume = self.rng.integers(1000, 5000001, n)
+        tickers = self.rng.integers(0, len(string.ascii_uppercase), (n, 4), dtype=np.uint8)
+        sectors = self.rng.integers(0, len(self.sectors), n, dtype=np.uint8)
+        
+        # Price walk as a cumulative product of the per-tick increase factors
+        increase_factor = self.rng.random((n, self.n_ticks)) * 0.05 - 0.02
+        close = start_price[:, None] * np.cumprod(1.0 + increase_factor, axis=1)
+        open_ = np.empty_like(close)
+        open_[:, 0] = start_price
+        open_[:, 1:] = close[:, :-1]
+        volume = avg_volume[:, None] * (self.rng.random((n, self.n_ticks)) * 0.2 + 0.9)
+        
+        return StockBatch(start_oid, tickers, sectors, reviews, positive_reviews,
+                          open_, close, increase_factor * 100.0, volume, self.sectors)
+    
+
+class StockBatch:
+    def __init__(self, start_oid, tickers, sectors, reviews, positive_reviews,
+                 open_, close, percent_change, volume, sector_names):
+        self.start_oid = start_oid
+        self.tickers = tickers
+        self.sectors = sectors
+        self.reviews = reviews
+        self.positive_reviews = positive_reviews
+        self.open = open_
+        self.close = close
+        self.percent_change = percent_change
+        self.volume = volume
+        self.sector_names = sector_names
+        
+    def __len__(self):
+        return len(self.reviews)
+    
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.start_oid + i, self.object(i)
+    
+    def object(self, i):
+        # Materialize a single object in the same layout as StockData.generate()
+        reviews = int(self.reviews[i])
+        positive_reviews = int(self.positive_reviews[i])
+        history = [{
+            "time_id": j + 1000,
+            "open": o,
+            "close": c,
+            "percentChange": p,
+            "volume": v
+        } for j, (o, c, p, v) in enumerate(zip(self.open[i].tolist(), self.close[i].tolist(),
+                                                self.percent_change[i].tolist(), self.volume[i].tolist()))]
+        return [{
+            "oid": self.start_oid + i,
+            "ticker": "".join(string.ascii_uppercase[k] for k in self.tickers[i]),
+            "sector": self.sector_names[self.sectors[i]],
+            "reviews": {
+                "total": reviews,
+                "positive": positive_reviews,
+                "negative": reviews - positive_reviews
+            },
+            "history": history,
+        }]
+        
+    def to_json(self, i, indent=4):
+        return json.dumps(self.object(i), indent=indent)
 
     
 class SwiftClient:
@@ -81,31 +162,46 @@ class SwiftClient:
         self.objects_per_container = 1000000
         self.generator = StockData()
         self.last_event_time = None
+        self.last_event_epoch = None
         self.last_event_type = None
+        self.movement_targets = None
+        self.last_series = None
         self.last_read_time = None
         self.last_read_start = None
         self.last_read_end = None
         self.last_write_start = None
         self.last_write_end = None
         self.log_fp = Path("data-movement-log.txt")
+        self.last_staging_time = None
+        self.last_upload_time = None
         self.read_q = Queue()
+        self.read_latencies = LatencyHistogram()
+        self.sizes = SizeIndex("container-data")
         
-        # VM Connections
-        self.cluster_c = {
-            "192.168.1.71": Connection(host="192.168.1.71", user="generic"),
-            "192.168.1.72": Connection(host="192.168.1.72", user="generic"),
-            "192.168.1.73": Connection(host="192.168.1.73", user="generic")
-        }
-        self.c = Connection(host="192.168.1.100", user="root", connect_kwargs={"password": "CS6343CC"})
+        # Controller session, registered with its password so every transport.run against it can log in
+        self.transport = transport
+        transport.connection("192.168.1.100", "root", connect_kwargs={"password": "CS6343CC"})
         
         # Open Swift config file
         with open("swiftconfig.json", "r") as f:
             self.ring_conf = json.load(f)
+        self.backend = self.ring_conf.get("backend", "cli")
+        self.http_client = None
+        self.local = None
+        self.placements = {}
+        
+        # Storage nodes as the object ring is configured, use_local_cluster swaps in the local ones
+        self.cluster = StorageCluster()
+        object_conf = self.ring_conf.get("object")
+        for i, (ip, weight) in enumerate(zip(object_conf.get("hosts"), object_conf.get("weights"))):
+            self.cluster.add(StorageNode(f"swift-object-{i + 1}", ip, weight, "running", sizes=self.sizes))
             
         # Open VM config file
         with open("../vmconfig.json", "r") as f:
             self.vm_names = json.load(f)
         self.next_zone_num = len(vm_mapping) + 1
+        if self.ring_conf.get("local_cluster"):
+            self.use_local_cluster(self.ring_conf.get("local_cluster"))
             
             # node_names = [entry.split()[1] for entry in result.split("\n")[2:]]
             # for name in node_names:
@@ -120,9 +216,45 @@ class SwiftClient:
         # os.environ["OS_PASSWORD"] = swift_password
         # print("Successful initialization!")
 
+    def use_local_cluster(self, root="local-cluster"):
+        # Run everything against an in-process fake proxy/object server instead of the VMs
+        storage_nodes = self.ring_conf.get("storage_nodes")
+        self.local = FakeSwiftCluster(root, storage_nodes, replicas=self.ring_conf.get("object").get("replicas")).start()
+        keystone = self.ring_conf.get("keystone")
+        self.backend = "native"
+        self.http_client = SwiftHTTPClient(auth_url=self.local.auth_url, credentials={
+            "username": keystone.get("OS_USERNAME"),
+            "project_name": keystone.get("OS_PROJECT_NAME"),
+            "user_domain_name": keystone.get("OS_USER_DOMAIN_NAME"),
+            "project_domain_name": keystone.get("OS_PROJECT_DOMAIN_NAME")
+        })
+        self.cluster = StorageCluster(local=self.local)
+        for i, ip in enumerate(storage_nodes):
+            self.cluster.add(StorageNode(f"swift-object-{i + 1}", ip, 100, "running", local=self.local, sizes=self.sizes))
+        print(f"Local cluster at {self.local.url}, data in {root}")
+        
+    def journal(self, unit, since=None):
+        if self.local is not None:
+            return self.local.journal(unit, since)
+        args = ["journalctl", "-o", "short-precise", "-u", unit] + (["--since", since] if since is not None else [])
+        return subprocess.check_output(args, universal_newlines=True, timeout=3, stderr=subprocess.DEVNULL).strip()
+    
+    def stats(self, verb, ip, *args, timeout=3):
+        if self.local is not None:
+            return self.local.stats(verb, ip, *args)
+        user = "generic" if verb.startswith("virsh") else "root"
+        return transport.script(["./stats.sh", verb, ip] + list(args), ip, user=user, timeout=timeout)
+    
+    def fan_out(self, verb, *args):
+        # Same stats.sh verb on every storage node at once, failed nodes are reported instead of retried
+        fanout = FanOut(timeout=self.ring_conf.get("stats_timeout", 3), budget=self.ring_conf.get("stats_budget", 10))
+        results = fanout.run(lambda ip, timeout: self.stats(verb, ip, *args, timeout=timeout),
+                             self.ring_conf.get("storage_nodes"))
+        fanout.report()
+        return results
+        
     def initconfig(self):
-        for ip in self.ring_conf.get("storage_nodes"):
-            subprocess.run(["./stats.sh", "initconfig", ip])
+        self.fan_out("initconfig")
             
     def add_auth_variables(self):
         vars = ["OS_USERNAME", "OS_PROJECT_NAME", "OS_USER_DOMAIN_NAME",
@@ -132,215 +264,285 @@ class SwiftClient:
             os.environ[v] = self.ring_conf.get("keystone").get(v)
 
     def create_ring(self):
-        # Account builder
-        account_replicas = self.ring_conf.get("account").get("replicas")
-        account_ips = self.ring_conf.get("account").get("hosts")
-        subprocess.run(["swift-ring-builder", "/etc/swift/account.builder", "create", "10", str(account_replicas), "0"])
-        for i, e in enumerate(vm_mapping.keys()):
-            subprocess.run(["swift-ring-builder", "/etc/swift/account.builder", "add", "--region", "10", "--zone", f"{i+1}",
-                            "--ip", e, "--port", "6202", "--device", "sdb", "--weight", "100"])
-        subprocess.run(["swift-ring-builder", "/etc/swift/account.builder", "rebalance"])
-        
-        # Container builder
-        container_replicas = self.ring_conf.get("container").get("replicas")
-        container_ips = self.ring_conf.get("container").get("hosts")
-        subprocess.run(["swift-ring-builder", "/etc/swift/container.builder", "create", "10", str(container_replicas), "0"])
-        for i, e in enumerate(vm_mapping.keys()):
-            subprocess.run(["swift-ring-builder", "/etc/swift/container.builder", "add", "--region", "10", "--zone", f"{i+1}",
-                            "--ip", e, "--port", "6201", "--device", "sdb", "--weight", "100"])
-        subprocess.run(["swift-ring-builder", "/etc/swift/container.builder", "rebalance"])
-        
-        # Object builder
-        object_replicas = self.ring_conf.get("object").get("replicas")
-        object_ips = self.ring_conf.get("object").get("hosts")
-        subprocess.run(["swift-ring-builder", "/etc/swift/object.builder", "create", "10", str(object_replicas), "0"])
-        for i, e in enumerate(vm_mapping.keys()):
-            subprocess.run(["swift-ring-builder", "/etc/swift/object.builder", "add", "--region", "10", "--zone", f"{i+1}",
-                            "--ip", e, "--port", "6200", "--device", "sdb", "--weight", "100"])
-        subprocess.run(["swift-ring-builder", "/etc/swift/object.builder", "rebalance"])
+        # Rings straight from swiftconfig.json: hosts, replicas and per-host weights
+        object_conf = self.ring_conf.get("object")
+        weights = dict(zip(object_conf.get("hosts"), object_conf.get("weights") or [100] * len(object_conf.get("hosts"))))
+        for node in self.cluster.nodes:
+            node.weight = weights.get(node.ip, node.weight)
+        if self.local is not None:
+            builder = RingBuilder(self.local.part_power, self.local.replicas)
+            for dev in ring_devices(object_conf, ring_ports["object"]):
+                builder.add_dev(dev["ip"], dev["zone"], dev["weight"])
+            builder.rebalance()
+            self.local.set_ring(builder.get_ring())
+            print(f"Local object ring built for {len(weights)} hosts")
+            return
+        start = time.time()
+        ring_files = build_rings(self.ring_conf)
+        print(f"Rings built in {round(time.time() - start, 3)} s")
         
-        # Move gz files to correct place
-        for ip in account_ips:
-            subprocess.run(["scp", "/etc/swift/account.ring.gz", f"root@{ip}:/etc/swift"])
-        for ip in container_ips:
-            subprocess.run(["scp", "/etc/swift/container.ring.gz", f"root@{ip}:/etc/swift"])
-        for ip in object_ips:
-            subprocess.run(["scp", "/etc/swift/object.ring.gz", f"root@{ip}:/etc/swift"])
-        
-    def as_timestamp(self, ts):
-        dt = datetime.now()
-        time_array = ts.split(":")
-        return datetime(dt.year, dt.month, dt.day, int(time_array[0]), int(time_array[1]), int(time_array[2]))
-
-    def add_data_container(self, n):
+        # Push every host its rings at once and check them with md5sum
+        start = time.time()
+        push = RingPush(ring_files, ring_hosts(self.ring_conf))
+        push.run()
+        print(push.table())
+        print(f"Rings pushed in {round(time.time() - start, 3)} s")
+        
+    def add_data_container(self, n, batch_size=1000):
         # Get current time
         start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         self.last_event_time = start_time
+        self.last_event_epoch = None
         
         # Container path
         fp = Path(f"container-{self.cur_container_num}")
         fp.mkdir(parents=True, exist_ok=True)
         
-        for i in range(n):
-            # Generate file and upload it
-            with open(fp / f"stock-data-{self.cur_object_num}.json", "w") as f:
-                f.write(json.dumps(self.generator.generate(oid=self.cur_object_num), indent=4))
-            
-            # Increment object number and possibly container number
-            self.cur_object_num += 1
-            if self.cur_object_num % self.objects_per_container == 0:
-                print(f"Uploading into Container {self.cur_container_num}...")
-                subprocess.run(["swift", "upload", f"container-{self.cur_container_num}", f"container-{self.cur_container_num}"])
-                # subprocess.run(["rm", "-rf", f"container-{self.cur_container_num}"])
-                self.cur_container_num += 1
-                fp = Path(f"container-{self.cur_container_num}")
-                fp.mkdir(parents=True, exist_ok=True)
+        remaining = n
+        while remaining > 0:
+            batch = self.generator.generate_batch(self.cur_object_num, min(batch_size, remaining))
+            remaining -= len(batch)
+            for i in range(len(batch)):
+                # Generate file and upload it
+                with open(fp / f"stock-data-{self.cur_object_num}.json", "w") as f:
+                    f.write(batch.to_json(i))
+                
+                # Increment object number and possibly container number
+                self.cur_object_num += 1
+                if self.cur_object_num % self.objects_per_container == 0:
+                    print(f"Uploading into Container {self.cur_container_num}...")
+                    subprocess.run(["swift", "upload", f"container-{self.cur_container_num}", f"container-{self.cur_container_num}"])
+                    # subprocess.run(["rm", "-rf", f"container-{self.cur_container_num}"])
+                    self.cur_container_num += 1
+                    fp = Path(f"container-{self.cur_container_num}")
+                    fp.mkdir(parents=True, exist_ok=True)
                 
         # Data from last container
         print(f"Uploading into Container {self.cur_container_num}...")
         subprocess.run(["swift", "upload", f"container-{self.cur_container_num}", f"container-{self.cur_container_num}"])
         # subprocess.run(["rm", "-rf", f"container-{self.cur_container_num}"])
         
-    def add_data(self, n):
+    def set_backend(self, backend):
+        self.backend = backend
+        print(f"Backend: {backend}")
+        
+    def native_client(self):
+        # One shared client so every caller draws from the same keep-alive pool and token
+        if self.http_client is None:
+            self.http_client = SwiftHTTPClient.from_keystone(self.ring_conf.get("keystone"), os.environ.get("OS_PASSWORD"))
+        return self.http_client
+        
+    def swift_connection(self):
+        if self.backend == "native":
+            return self.native_client()
+        try:
+            from swiftclient.client import Connection as SwiftConnection
+        except ImportError:
+            # python-swiftclient is not a requirement, the native client speaks the same calls
+            return self.native_client()
+        keystone = self.ring_conf.get("keystone")
+        return SwiftConnection(authurl=keystone.get("OS_AUTH_URL"),
+                               user=keystone.get("OS_USERNAME"),
+                               key=os.environ.get("OS_PASSWORD"),
+                               auth_version=keystone.get("OS_IDENTITY_API_VERSION"),
+                               os_options={
+                                   "project_name": keystone.get("OS_PROJECT_NAME"),
+                                   "user_domain_name": keystone.get("OS_USER_DOMAIN_NAME"),
+                                   "project_domain_name": keystone.get("OS_PROJECT_DOMAIN_NAME")
+                               })
+        
+    def stream_data(self, n, generator_workers=2, uploader_workers=8):
+        # Get current time and set as event time
+        now = datetime.now()
+        start_time = now.strftime("%Y-%m-%d %H:%M:%S")
+        self.last_event_time = start_time
+        self.last_event_epoch = now.timestamp()
+        self.cluster.set_event_time(start_time, now.timestamp())
+        self.last_event_type = "stream-data"
         self.start_object_num = self.cur_object_num
         self.end_object_num = self.cur_object_num + n
         self.cluster.start_obj = self.start_object_num
         self.cluster.end_obj = self.end_object_num
         
-        # Container path
-        fp = Path(f"container-data-temp")
-        fp.mkdir(parents=True, exist_ok=True)
+        # Generate and upload straight from memory, under the same names add-data uses
+        pipeline = UploadPipeline(self.swift_connection, lambda seed: StockData(seed=seed), "container-1",
+                                  generator_workers=generator_workers, uploader_workers=uploader_workers,
+                                  object_name=self.object_name, sizes=self.sizes)
+        pipeline.run(self.cur_object_num, n)
+        self.cur_object_num += n
+        print(pipeline)
+        
+    def object_name(self, oid):
+        # Same name `swift upload container-1 container-data-temp` gives the object
+        return f"container-data-temp/stock-data-{oid}.json"
+        
+    def add_data(self, n, mode="link", concurrency=None, retries=0):
+        self.start_object_num = self.cur_object_num
+        self.end_object_num = self.cur_object_num + n
+        self.cluster.start_obj = self.start_object_num
+        self.cluster.end_obj = self.end_object_num
+        if concurrency is not None:
+            self.add_data_concurrent(n, concurrency, retries)
+            return
         
-        for i in range(self.start_object_num, self.end_object_num):
-            # Increment object number and possibly container number
-            subprocess.run(["cp", f"container-data/stock-data-{i}.json", "container-data-temp"])
+        # Stage files with hardlinks/kernel copies, or upload them in place from a manifest
+        oids = range(self.start_object_num, self.end_object_num)
+        stage_start = time.time()
+        if mode == "manifest":
+            paths = object_paths(oids)
+        else:
+            stage_objects(oids, link=(mode == "link"))
+        self.last_staging_time = time.time() - stage_start
+        self.last_upload_time = None
+        print(f"Staging Time: {round(self.last_staging_time, 3)} s")
             
         # Get current time and set as event time
-        start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        now = datetime.now()
+        start_time = now.strftime("%Y-%m-%d %H:%M:%S")
         self.last_event_time = start_time
-        self.cluster.set_event_time(start_time)
+        self.last_event_epoch = now.timestamp()
+        self.cluster.set_event_time(start_time, now.timestamp())
         self.last_event_type = "add-data"
         self.cur_object_num += n
         
         # Upload info into container
-        subprocess.Popen(["./data-actions.sh", "add"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if mode == "manifest":
+            t = threading.Thread(target=self.upload_paths, args=(paths,))
+        else:
+            t = threading.Thread(target=self.upload_staged)
+        t.daemon = True
+        t.start()
+        
+    def add_data_concurrent(self, n, concurrency, retries=0):
+        # Upload straight from container-data, no staging needed
+        oids = range(self.start_object_num, self.end_object_num)
+        items = list(zip([self.object_name(oid) for oid in oids], object_paths(oids)))
+        self.last_staging_time = None
+        
+        # Get current time and set as event time
+        now = datetime.now()
+        start_time = now.strftime("%Y-%m-%d %H:%M:%S")
+        self.last_event_time = start_time
+        self.last_event_epoch = now.timestamp()
+        self.cluster.set_event_time(start_time, now.timestamp())
+        self.last_event_type = "add-data"
+        self.cur_object_num += n
+        
+        engine = UploadEngine(self.swift_connection, "container-1", concurrency=concurrency, retries=retries)
+        engine.run(items)
+        self.last_upload_time = engine.elapsed
+        print(engine)
+        
+    def upload_staged(self):
+        upload_start = time.time()
+        if self.backend == "native":
+            fp = Path("container-data-temp")
+            self.upload_native([str(fp / name) for name in os.listdir(fp)])
+            subprocess.run(["rm", "-rf", "container-data-temp"])
+        else:
+            subprocess.run(["./data-actions.sh", "add"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.last_upload_time = time.time() - upload_start
+        
+    def upload_paths(self, paths):
+        # `swift upload` names each object after its source path (container-data/...), which is not
+        # object_name(), so both backends put the files over the shared HTTP client
+        upload_start = time.time()
+        self.upload_native(paths)
+        self.last_upload_time = time.time() - upload_start
+        
+    def upload_native(self, paths):
+        conn = self.native_client()
+        conn.put_container("container-1")
+        for path in paths:
+            oid = int(re.split("[.-]", Path(path).name)[2])
+            with open(path, "rb") as f:
+                conn.put_object("container-1", self.object_name(oid), f.read())
         
     def get_data_movement_stats(self):
         # Collect logs since an event
-        if self.last_event_time is None:
-            result = subprocess.check_output(["journalctl", "-u", "openstack-swift-proxy"], 
-                                                universal_newlines=True, 
-                                                timeout=3, 
-                                                stderr=subprocess.DEVNULL).strip()
-        else:
-            result = subprocess.check_output(["journalctl", "-u", "openstack-swift-proxy", "--since", self.last_event_time], 
-                                                universal_newlines=True, 
-                                                timeout=3, 
-                                                stderr=subprocess.DEVNULL).strip()
+        result = self.journal("openstack-swift-proxy", self.last_event_time)
         
         # Parse the results
-        array = [entry for entry in result.split("\n")]
+        records = parse_journal(result, "proxy", method="PUT")
         last_ts = None
         total_bytes = 0
-        for entry in array:
-            if "PUT /v1" in entry:
-                request_array = entry.split()
-                ts = request_array[2]
-                last_ts = ts
-                object_url = request_array[9].split("/")[-1]
-                if not object_url.startswith("stock-data"):
-                    continue
-                object_size = int(request_array[15])
-                response_time = float(request_array[20])
-                total_bytes += object_size
-                print(f"PUT Time: {ts}, Object: {object_url}, Object Size: {object_size}")
+        for record in records:
+            if last_ts is None or record.ts > last_ts:
+                last_ts = record.ts
+            total_bytes += record.bytes
+            print(f"PUT Time: {clock(record.ts)}, Object: {record.path.split('/')[-1]}, Object Size: {record.bytes}")
+        if last_ts is None:
+            print("No data inserted yet.")
+            return
         
         # Calculate high level stats
-        dt = datetime.now()
-        time_array = last_ts.split(":")
-        end_time = datetime(dt.year, dt.month, dt.day, int(time_array[0]), int(time_array[1]), int(time_array[2]))
-        start_time = datetime.strptime(self.last_event_time, "%Y-%m-%d %H:%M:%S")
-        delta_sec = (end_time - start_time).total_seconds()
+        start_time = datetime.strptime(self.last_event_time, "%Y-%m-%d %H:%M:%S").timestamp()
+        delta_sec = round(last_ts - start_time, 3)
         
         # Metrics
         print(f"Time Elapsed: {delta_sec} seconds")
         print(f"Total Data Size: {total_bytes / 1024.0} KB")
-        print(f"Speed: {round(total_bytes / 1024.0 / delta_sec, 3)} KB/s")
+        if delta_sec > 0:
+            print(f"Speed: {round(total_bytes / 1024.0 / delta_sec, 3)} KB/s")
         
     def get_data_movement_stats_v2(self):
-        put_requests = []
+        store = RecordStore()
         # Make requests to all Storage nodes
-        for ip in self.ring_conf.get("storage_nodes"):
-            try:
-                last_event_time = self.last_event_time if self.last_event_time is not None else "None"
-                result = subprocess.check_output(["./stats.sh", "object-requests", ip, "PUT", last_event_time], 
-                                                    universal_newlines=True, 
-                                                    timeout=3).strip()
-                # Parse the results
-                put_requests += [entry for entry in result.split("\n") if "PUT /sdb" in entry]
-            except Exception:
-                pass
+        last_event_time = self.last_event_time if self.last_event_time is not None else "None"
+        for node in self.fan_out("object-requests", "PUT", last_event_time):
+            if not node.ok:
+                continue
+            # Parse the results
+            columns = parse_columns(node.value, "object", method="PUT")
+            batch = RecordBatch(node.node)
+            batch.ts, batch.oid, batch.latency = columns.column("ts"), columns.column("oid"), columns.column("duration")
+            batch.size = [self.sizes.get(path.split("/")[-1], size)
+                          for path, size in zip(columns.column("path"), columns.column("bytes"))]
+            store.extend(batch)
+        
+        # Only the objects of the last add-data count
+        mask = store.in_range(self.start_object_num, self.end_object_num)
+        ts, oid, size, latency = [store.column(name)[mask] for name in ["ts", "oid", "size", "latency"]]
+        lines = [f"PUT Time: {clock(ts[i])}, Object: stock-data-{oid[i]}.json, Object Size: {size[i]}, Response Time: {latency[i]}"
+                 for i in np.argsort(ts, kind="stable").tolist()]
         
         # New write file
         if self.log_fp.exists():
             self.log_fp.unlink()
-        f = open(self.log_fp, "a")
-            
-        # Object add range
-        target_oids = set(list(range(self.start_object_num, self.end_object_num)))
-        received_oids = set()
-        
-        # Get stats
-        last_ts = None
-        total_bytes = 0
-        total_response_time = 0
-        total_requests = 0
-        
-        # Iterate through PUT requests
-        for entry in put_requests:
-            request_array = entry.split()
-            ts = request_array[2]
-            object_url = request_array[11][:-1].split("/")[-1]
-            if not object_url.startswith("stock-data"):
-                continue
-            object_oid = int(re.split("[.-]", object_url)[2])
-            # Object size
-            object_size = int(subprocess.check_output(["ls", "-l", f"container-data/{object_url}"], 
-                                                universal_newlines=True, 
-                                                timeout=3, 
-                                                stderr=subprocess.DEVNULL).strip().split()[4])
-            response_time = float(request_array[19])
-            received_oids.add(object_oid)
-            if object_oid in target_oids:
-                # Max timestamp
-                if last_ts is None or self.as_timestamp(ts) > self.as_timestamp(last_ts):
-                    last_ts = ts
-                total_bytes += object_size
-                total_requests += 1
-                total_response_time += response_time
-                print(f"PUT Time: {ts}, Object: {object_url}, Object Size: {object_size}, Response Time: {response_time}")
-                f.write(f"PUT Time: {ts}, Object: {object_url}, Object Size: {object_size}, Response Time: {response_time}\n")
+        with open(self.log_fp, "w") as f:
+            f.writelines(line + "\n" for line in lines)
+        if lines:
+            print("\n".join(lines))
             
         # Check if we have everything
         print()
-        f.close()
-        if target_oids.issubset(received_oids):
+        if np.isin(np.arange(self.start_object_num, self.end_object_num), store.column("oid")).all():
             print("Status: COMPLETE")
         else:
             print("Status: INCOMPLETE")
             
         # Calculate high level stats
-        if last_ts is not None:
-            end_time = self.as_timestamp(last_ts)
-            start_time = datetime.strptime(self.last_event_time, "%Y-%m-%d %H:%M:%S")
-            delta_sec = (end_time - start_time).total_seconds()
+        summary = store.summary(mask)
+        if summary["last_ts"] is not None:
+            start_time = datetime.strptime(self.last_event_time, "%Y-%m-%d %H:%M:%S").timestamp()
+            delta_sec = round(summary["last_ts"] - start_time, 3)
+            total_bytes = summary["bytes"]
+            series = store.series(self.event_start(), mask=mask)
             
             # Metrics
-            print(f"Total Requests Made: {total_requests} requests")
+            print(f"Total Requests Made: {summary['requests']} requests")
             print(f"Time Elapsed: {delta_sec} seconds")
             print(f"Total Data Size: {total_bytes / 1024.0} KB")
-            print(f"Speed: {round(total_bytes / 1024.0 / delta_sec, 3)} KB/s")
-            print(f"Average Response Time: {round(total_response_time / total_requests, 3)} s")
+            if delta_sec > 0:
+                print(f"Speed: {round(total_bytes / 1024.0 / delta_sec, 3)} KB/s")
+            print(f"Average Response Time: {round(summary['response_time'] / summary['requests'], 3)} s")
+            print(f"Steady State Speed: {round(series.steady_state(), 3)} KB/s")
+            print(latency_table(store.latency_histograms(mask)))
+            self.last_series = series
+            if self.last_staging_time is not None:
+                print(f"Staging Time: {round(self.last_staging_time, 3)} s")
+            if self.last_upload_time is not None:
+                print(f"Client Upload Time: {round(self.last_upload_time, 3)} s")
         
         # Print that nothing has happened
         else:
@@ -360,68 +562,128 @@ class SwiftClient:
     def generate_read_req(self):
         self.req_oids = []
         self.last_read_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.read_latencies = LatencyHistogram()
         while True:
             read_oid = 1
             self.req_oids.append(read_oid)
-            self.c.run(f"swift download container-1 container-data-temp/stock-data-{read_oid}.json --os-auth-url http://controller:500/v3 --os-username admin --os-password CS6343CC", hide=True)
+            if self.backend == "native":
+                self.native_client().get_object("container-1", f"container-data-temp/stock-data-{read_oid}.json")
+            else:
+                transport.run("192.168.1.100", f"swift download container-1 container-data-temp/stock-data-{read_oid}.json --os-auth-url http://controller:500/v3 --os-username admin --os-password CS6343CC", hide=True)
             time.sleep(0.2)
         
+    def read_load(self, workers=8, duration=30, dist="uniform", skew=0.99, max_oid=None):
+        # Read over the uploaded oid range
+        max_oid = max_oid if max_oid is not None else self.cur_object_num - 1
+        if max_oid < 1:
+            print("No objects uploaded yet, pass a max oid.")
+            return
+        chooser = key_chooser(dist, 1, max_oid, skew)
+        self.last_read_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        generator = ReadLoadGenerator(self.swift_connection, "container-1", self.object_name, chooser,
+                                      workers=workers, duration=duration)
+        generator.run()
+        print(f"Distribution: {dist}, Objects: 1-{max_oid}")
+        print(generator)
+        
+    def open_load(self, op="read", rate=100, duration=30, arrival="poisson", workers=64,
+                  dist="uniform", skew=0.99, max_oid=None):
+        if op == "read":
+            max_oid = max_oid if max_oid is not None else self.cur_object_num - 1
+            if max_oid < 1:
+                print("No objects uploaded yet, pass a max oid.")
+                return
+            chooser = key_chooser(dist, 1, max_oid, skew)
+            
+            def operation(conn, seq, rng):
+                _, body = conn.get_object("container-1", self.object_name(chooser.next(rng)))
+                return len(body)
+        else:
+            first_oid = self.cur_object_num
+            
+            def operation(conn, seq, rng):
+                with open(f"container-data/stock-data-{first_oid + seq}.json", "rb") as f:
+                    payload = f.read()
+                conn.put_object("container-1", self.object_name(first_oid + seq), payload)
+                return len(payload)
+            
+        self.last_read_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        generator = OpenLoopGenerator(self.swift_connection, operation, rate, duration=duration,
+                                      arrival=arrival, workers=workers)
+        generator.run()
+        if op != "read":
+            self.cur_object_num += generator.sent
+        print(f"Operation: {op}, Arrivals: {arrival}")
+        print(generator)
+        
+    def run_workload(self, preset, workers=8, duration=30, skew=0.99, max_oid=None):
+        max_oid = max_oid if max_oid is not None else self.cur_object_num - 1
+        if max_oid < 1:
+            print("No objects uploaded yet, pass a max oid.")
+            return
+        
+        # Updates and inserts write a freshly generated object under the same name
+        def payload(oid):
+            return json.dumps(StockData().generate(oid), indent=4).encode()
+        
+        workload = Workload(self.swift_connection, "container-1", self.object_name, payload, preset,
+                            1, max_oid, workers=workers, duration=duration, skew=skew)
+        workload.run()
+        self.cur_object_num = max(self.cur_object_num, workload.next_oid)
+        print(f"Workload: {preset}, Objects: 1-{max_oid}")
+        print(workload)
+        
     def get_read_req_stats(self):
         while True:
-            result = subprocess.check_output(["journalctl", "-u", "openstack-swift-proxy", "--since", self.last_read_time], 
-                                                    universal_newlines=True, 
-                                                    timeout=3, 
-                                                    stderr=subprocess.DEVNULL).strip()
-            get_requests = [entry for entry in result.split("\n") if "GET /v1" in entry and "stock-data" in entry]
-            response_times = []
+            result = self.journal("openstack-swift-proxy", self.last_read_time)
+            get_requests = parse_journal(result, "proxy", method="GET")
             # Requests
-            for i, entry in enumerate(get_requests):
-                request_array = entry.split()
-                # object_url = request_array[9].split("/")[-1]
-                response_time = float(request_array[20])
-                response_times.append(response_time)
-                print(f"GET Request {i+1} - Response Time: {round(response_time, 3)}s, Moving Average: {round(moving_average(response_times, 5), 3)}s")
+            for i, record in enumerate(get_requests):
+                response_time = record.duration
+                self.read_latencies.record(response_time)
+                print(f"GET Request {i+1} - Response Time: {round(response_time, 3)}s, "
+                      f"p50: {round(self.read_latencies.percentile(50), 3)}s, p99: {round(self.read_latencies.percentile(99), 3)}s")
             self.last_read_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             time.sleep(3)
             
 
-    def generate_write_req(self):
+    def generate_write_req(self, concurrency=None, retries=0):
         self.req_oids = range(self.cur_object_num, self.cur_object_num + 10)
         self.cur_object_num += 10
         self.last_write_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        # Container path
-        fp = Path(f"container-data-temp")
-        fp.mkdir(parents=True, exist_ok=True)
-        
-        # Copy files to temp
-        for i in range(10):
-            write_oid = self.req_oids[i]
-            subprocess.run(["cp", f"container-data/stock-data-{write_oid}.json", "container-data-temp"])
+        # Stage files to temp
+        stage_objects(self.req_oids)
         
         # Write requests
-        for i in tqdm(range(10)):
-            write_oid = self.req_oids[i]
-            p = subprocess.Popen(["swift", "upload", "container-1", f"container-data-temp/stock-data-{write_oid}.json"],
-                                 stdout=subprocess.DEVNULL)
-            p.wait()
+        if concurrency is not None:
+            engine = UploadEngine(self.swift_connection, "container-1", concurrency=concurrency, retries=retries)
+            engine.run([(self.object_name(oid), f"container-data-temp/stock-data-{oid}.json") for oid in self.req_oids])
+            print(engine)
+        else:
+            for i in tqdm(range(10)):
+                write_oid = self.req_oids[i]
+                if self.backend == "native":
+                    with open(f"container-data-temp/stock-data-{write_oid}.json", "rb") as f:
+                        self.native_client().put_object("container-1", self.object_name(write_oid), f.read())
+                    continue
+                p = subprocess.Popen(["swift", "upload", "container-1", f"container-data-temp/stock-data-{write_oid}.json"],
+                                     stdout=subprocess.DEVNULL)
+                p.wait()
         time.sleep(0.5)
         self.get_write_req_stats()
         
     def get_write_req_stats(self):
-        result = subprocess.check_output(["journalctl", "-u", "openstack-swift-proxy", "--since", self.last_write_time], 
-                                                universal_newlines=True, 
-                                                timeout=3, 
-                                                stderr=subprocess.DEVNULL).strip()
-        put_requests = [entry for entry in result.split("\n") if "PUT /v1" in entry and "stock-data" in entry]
-        response_times = []
+        result = self.journal("openstack-swift-proxy", self.last_write_time)
+        put_requests = parse_journal(result, "proxy", method="PUT")
+        latencies = LatencyHistogram()
         # Requests
-        for i, entry in enumerate(put_requests):
-            request_array = entry.split()
-            # object_url = request_array[9].split("/")[-1]
-            response_time = float(request_array[20])
-            response_times.append(response_time)
-            print(f"PUT Request {i+1} - Response Time: {round(response_time, 3)}s, Moving Average: {round(moving_average(response_times, 5), 3)}s")
+        for i, record in enumerate(put_requests):
+            response_time = record.duration
+            latencies.record(response_time)
+            print(f"PUT Request {i+1} - Response Time: {round(response_time, 3)}s, "
+                  f"p50: {round(latencies.percentile(50), 3)}s, p99: {round(latencies.percentile(99), 3)}s")
+        print(latency_table({"proxy": latencies}))
            
     def get_data_movement_logs(self):
         with open(self.log_fp, "r") as f:
@@ -429,21 +691,25 @@ class SwiftClient:
             print(data)
                 
     def restart_nodes(self):
-        for ip in self.ring_conf.get("storage_nodes"):
-            subprocess.run(["ssh", f"root@{ip}", "./restart-storage.sh"])
+        if self.local is not None:
+            return
+        fanout = FanOut(timeout=60, budget=120)
+        fanout.run(lambda ip, timeout: transport.run(ip, "./restart-storage.sh", hide=True, timeout=timeout),
+                   self.ring_conf.get("storage_nodes"))
+        fanout.report()
         subprocess.run(["systemctl", "restart", "openstack-swift-proxy.service", "memcached.service"])
         
     def shutdown_nodes(self):
+        if self.local is not None:
+            for ip in self.ring_conf.get("storage_nodes"):
+                self.local.set_node_status(ip, False)
+            return
         for ip in self.vm_names.get("cluster_nodes"):
-            result = subprocess.check_output(["./stats.sh", "virsh-running-nodes", ip], 
-                                                    universal_newlines=True, 
-                                                    timeout=3, 
-                                                    stderr=subprocess.DEVNULL).strip()
+            result = self.stats("virsh-running-nodes", ip)
             node_names = [entry.split()[1] for entry in result.split("\n")[2:]]
             for name in node_names:
                 if name in self.vm_names.get("swift"):
-                    subprocess.run(["./stats.sh", "virsh-shutdown", ip, name],
-                                   stdout=subprocess.DEVNULL)
+                    transport.run(ip, f"sudo virsh shutdown {name}", user="generic", hide=True, warn=True)
                     
     def add_node_ip(self, ip):
         self.cluster.add_ip(ip, self.next_zone_num)
@@ -473,51 +739,98 @@ class SwiftClient:
         print(result)
     
     def startup_nodes(self):
+        if self.local is not None:
+            for ip in self.ring_conf.get("storage_nodes"):
+                self.local.set_node_status(ip, True)
+            return
         for ip in self.vm_names.get("cluster_nodes"):
-            result = subprocess.check_output(["./stats.sh", "virsh-shutoff-nodes", ip], 
-                                                    universal_newlines=True, 
-                                                    timeout=3, 
-                                                    stderr=subprocess.DEVNULL).strip()
+            result = self.stats("virsh-shutoff-nodes", ip)
             node_names = [entry.split()[1] for entry in result.split("\n")[2:]]
             for name in node_names:
                 if name in self.vm_names.get("swift"):
-                    subprocess.run(["./stats.sh", "virsh-startup", ip, name],
-                                   stdout=subprocess.DEVNULL)
+                    transport.run(ip, f"sudo virsh start {name}", user="generic", hide=True, warn=True)
 
     def clear_data(self):
-        subprocess.run(["swift", "delete", "-a"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if self.backend == "native":
+            conn = self.native_client()
+            for container in conn.list_containers():
+                for entry in list(conn.list_objects(container.get("name"))):
+                    conn.delete_object(container.get("name"), entry.get("name"))
+        else:
+            subprocess.run(["swift", "delete", "-a"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
         print("Data Cleared!")
         
     def force_clear_data(self):
-        for ip in self.ring_conf.get("storage_nodes"):
-            try:
-                subprocess.run(["./stats.sh", "data-delete", ip],
-                                        stdout=subprocess.DEVNULL, timeout=3)
-            except Exception:
-                pass
+        self.fan_out("data-delete")
         
     def datacount(self):
         print("Number of Objects in Storage Nodes:")
         # Stats logging
         t = PrettyTable(["Node IP", "Num Objects"])
-        for ip in self.ring_conf.get("storage_nodes"):
-            try:
-                result = subprocess.check_output(["./stats.sh", "datacount", ip], universal_newlines=True, 
-                                                 timeout=3, stderr=subprocess.DEVNULL).strip()
-                t.add_row([ip, result])
-            except Exception:
-                t.add_row([ip, 0])
+        for node in self.fan_out("datacount"):
+            t.add_row([node.node, node.value if node.ok else 0])
         print(str(t))
         
-    def dataloc(self):
+    def placement(self, container="container-1"):
+        # Ring loaded once per container and reloaded when object.ring.gz changes
+        if self.local is not None:
+            fp, account = self.local.ring_fp, self.local.account
+        else:
+            fp = self.ring_conf.get("object_ring", "/etc/swift/object.ring.gz")
+            account = self.ring_conf.get("swift_account")
+            if account is None:
+                client = self.native_client()
+                client.authenticate()
+                account = client.storage_url.rstrip("/").rsplit("/", 1)[-1]
+        key = (container, os.path.getmtime(fp))
+        if key not in self.placements:
+            self.placements = {key: Placement.from_file(fp, account, container)}
+        return self.placements[key]
+        
+    def oid_range(self, max_oid=None):
+        max_oid = max_oid if max_oid is not None else self.cur_object_num - 1
+        if max_oid < 1:
+            print("No objects uploaded yet, pass a max oid.")
+        return list(range(1, max_oid + 1))
+        
+    def dataloc(self, max_oid=None, container="container-1", show=1000):
+        # Placement computed from the ring on the controller, the nodes are not touched
+        oids = self.oid_range(max_oid)
+        if not oids:
+            return
+        start = time.time()
+        placement = self.placement(container)
+        devs = placement.devices(placement.partitions([self.object_name(oid) for oid in oids]))
+        if len(oids) <= show:
+            t = PrettyTable(["OID", "Storage IPs"])
+            for oid, replicas in zip(oids, placement.dev_ips[devs].T.tolist()):
+                t.add_row([oid, ", ".join(ip for ip in replicas if ip)])
+            print(str(t))
+        print(counts_table(placement.device_counts(devs)))
+        print(f"Located {len(oids)} objects in {round(time.time() - start, 3)} s")
+        
+    def where(self, oid, container="container-1"):
+        placement = self.placement(container)
+        name = self.object_name(oid)
+        print(f"{name}: partition {placement.partition(name)}, nodes {', '.join(placement.nodes(name))}")
+        
+    def node_objects(self, ip, max_oid=None, container="container-1"):
+        oids = self.oid_range(max_oid)
+        if not oids:
+            return []
+        held = self.placement(container).on_node(ip, [self.object_name(oid) for oid in oids], oids)
+        print(f"{len(held)} of {len(oids)} objects have a replica on {ip}")
+        return held
+        
+    def dataloc_scan(self):
+        # Reads every object file on every node, kept to check the ring against what is actually on disk
         t = PrettyTable(["OID", "Storage IP"])
         location_dict = {}
-        for ip in self.ring_conf.get("storage_nodes"):
+        for node in self.fan_out("dataloc"):
             try:
-                result = subprocess.check_output(["./stats.sh", "dataloc", ip], universal_newlines=True, timeout=3).strip()
-                data_ids = [int(item.split(":")[1].strip()[:-1]) for item in result.split("\n")]
+                data_ids = [int(item.split(":")[1].strip()[:-1]) for item in node.value.split("\n")]
                 for oid in data_ids:
-                    location_dict[oid] = ip
+                    location_dict[oid] = node.node
             except Exception:
                 pass
         for key in sorted(location_dict):
@@ -530,12 +843,143 @@ class SwiftClient:
     def set_weight(self, ip, weight):
         self.cluster.set_weight(ip, weight)
         
-    def rebalance(self):
+    def current_ring(self):
+        if self.local is not None:
+            return self.local.ring
+        return RingData.load(self.ring_conf.get("object_ring", "/etc/swift/object.ring.gz"))
+        
+    def rebalance(self, container="container-1"):
+        # Diff the ring before and after so movement collection knows which objects move and how many replicas.
+        # The rebalance itself never depends on the diff, without one `movement` follows until its deadline
+        try:
+            old = self.current_ring()
+        except Exception:
+            old = None
         self.cluster.rebalance()
+        self.last_event_type = "rebalance"
+        self.last_event_time, self.last_event_epoch = self.cluster.last_read_time, self.cluster.last_event_epoch
+        self.movement_targets = None
+        oids = list(range(1, self.cur_object_num))
+        if old is None or not oids:
+            return
+        try:
+            parts = self.placement(container).partitions([self.object_name(oid) for oid in oids])
+            self.movement_targets = MovementPlan(old, self.current_ring()).object_moves(parts, oids)
+        except Exception as e:
+            print(f"Could not work out which objects move ({e}), movement will follow until its deadline")
+            return
+        print(f"{len(self.movement_targets)} of {len(oids)} objects move")
         
-    def get_movement(self):
-        self.cluster.get_put_requests()
-        self.cluster.process_put_queue()
+    def plan_rebalance(self, changes, max_oid=None, container="container-1"):
+        # Dry run on a copy of the builder, the real ring is left alone
+        if self.local is not None:
+            simulator = RebalanceSimulator(ring=self.local.ring)
+        else:
+            simulator = RebalanceSimulator(self.ring_conf.get("object_builder", "/etc/swift/object.builder"))
+        new = simulator.simulate(changes)
+        oids = list(range(1, (max_oid if max_oid is not None else self.cur_object_num - 1) + 1))
+        placement = self.placement(container)
+        parts = placement.partitions([self.object_name(oid) for oid in oids])
+        sizes = [self.sizes.get(f"stock-data-{oid}.json") for oid in oids]
+        return MovementPlan(simulator.ring, new, parts, sizes), len(oids)
+        
+    def simulate_rebalance(self, changes, kbps=None, max_oid=None, container="container-1"):
+        changes = parse_changes(changes) if isinstance(changes, str) else changes
+        plan, n = self.plan_rebalance(changes, max_oid, container)
+        if kbps is None:
+            # Last measured data movement speed if there is one
+            kbps = self.last_series.steady_state() if self.last_series is not None else 0.0
+            kbps = kbps or self.ring_conf.get("replication_kbps", 1024)
+        print(f"{plan.partitions} of {plan.old.part_count} partitions move, "
+              f"{plan.total_objects()} of {n} objects")
+        print(plan.table(kbps))
+        print(f"Estimated at {round(kbps, 3)} KB/s")
+        return plan
+        
+    def probe_latency(self, conn, container="container-1"):
+        # One small foreground PUT and GET through the proxy, the name has no oid so movement stats skip it
+        body = json.dumps({"probe": time.time()})
+        start = time.time()
+        conn.put_object(container, "ramp-probe.json", body)
+        put_latency = time.time() - start
+        start = time.time()
+        conn.get_object(container, "ramp-probe.json")
+        return time.time() - start, put_latency
+        
+    def ramp_weights(self, targets, steps=4, latency_limit=0.5, settle=5.0, step_timeout=300, max_oid=None):
+        # Weight change applied in steps, each one waits for its data movement and foreground latency
+        current = {node.ip: float(node.weight) for node in self.cluster.nodes}
+        unknown = [ip for ip in targets if ip not in current]
+        if unknown:
+            print(f"Not in the ring: {', '.join(unknown)}")
+            return False
+        conn = self.swift_connection()
+        
+        def apply(weights):
+            for ip, weight in weights.items():
+                self.cluster.set_weight(ip, str(weight))
+            self.cluster.rebalance()
+        
+        def expected(weights):
+            plan, _ = self.plan_rebalance([("set_weight", ip, weight) for ip, weight in weights.items()], max_oid)
+            return plan.total_objects() or None
+        
+        ramp = WeightRamp(self.cluster, current, targets, apply, lambda: self.probe_latency(conn), expected,
+                          steps=steps, latency_limit=latency_limit, settle=settle, step_timeout=step_timeout)
+        done = ramp.run()
+        print(ramp.table())
+        print("Ramp complete." if done else "Ramp stopped, weights left at the last applied step.")
+        return done
+        
+    def get_movement(self, deadline=60, background=False):
+        if background:
+            t = threading.Thread(target=self.collect_movement, args=(deadline, False))
+            t.daemon = True
+            t.start()
+            print("Collecting in the background, check on it with movement-status")
+            return
+        self.collect_movement(deadline)
+        
+    def collect_movement(self, deadline=60, verbose=True):
+        if self.last_event_type == "rebalance":
+            # Only the replicas that changed device are PUT again, object -> how many of them.
+            # None when the objects are not known (e.g. a new session), then every PUT until the deadline counts
+            target_oids = self.movement_targets
+        else:
+            target_oids = range(self.cluster.start_obj, self.cluster.end_obj) or None
+        if target_oids is not None and not target_oids:
+            print("No objects to wait for, nothing to collect.")
+            return
+        self.cluster.get_put_requests(target_oids, self.ring_conf.get("object").get("replicas"), deadline,
+                                      verbose=verbose)
+        self.last_series = self.cluster.process_put_queue()
+        
+    def movement_status(self):
+        print(self.cluster.live_stats())
+        
+    def event_start(self):
+        if self.last_event_epoch is not None:
+            return self.last_event_epoch
+        return datetime.strptime(self.last_event_time, "%Y-%m-%d %H:%M:%S").timestamp()
+        
+    def show_throughput(self, interval=1.0):
+        if self.last_series is None:
+            print("No data movement collected yet, run data-movement or movement first.")
+            return
+        series = self.last_series.rebin(interval)
+        print(f"Event: {self.last_event_type}, Interval: {series.interval} s")
+        print(series.table())
+        print(f"Steady State Speed: {round(series.steady_state(), 3)} KB/s")
+        
+    def export_throughput(self, path):
+        if self.last_series is None:
+            print("No data movement collected yet, run data-movement or movement first.")
+            return
+        if path.endswith(".json"):
+            self.last_series.to_json(path)
+        else:
+            self.last_series.to_csv(path)
+        print(f"Throughput series written to {path}")
 
     def test(self):
         self.cluster.get_put_requests()
@@ -547,105 +991,97 @@ if __name__ == "__main__":
     client.restart_nodes()
     
 class LogReader:
-    def __init__(self, ip):
+    def __init__(self, ip, local=None, sizes=None):
         self.ip = ip
-        self.c = Connection(host=ip, user="root")
+        self.local = local
+        self.sizes = sizes if sizes is not None else SizeIndex("container-data")
         self.last_read_time = None
-        self.last_recorded_ts = ""
-        self.reqs_in_last_ts = 0
-        
-    def read(self, mode, q):
-        patience = 10
-        no_req_patience = 25
-        no_req_empty_reqs = 0
-        empty_requests = 0
-        req_received = False
-        while True:
-            if mode == "PUT":
-                results = self.read_puts()
-            else:
-                results = self.read_gets()
-            if not results and req_received:
-                empty_requests += 1
-                time.sleep(1)
-                if empty_requests > patience:
-                    break
-            elif not results:
-                no_req_empty_reqs += 1
-                time.sleep(1)
-                if no_req_empty_reqs > no_req_patience:
-                    break
-            elif results:
-                req_received = True
-                empty_requests = 0
-                no_req_empty_reqs = 0
-            if mode == "PUT":
-                self.process_puts(results, q)
-            else:
-                self.process_gets(results, q)
+        self.after = 0.0
+        self.cursors = {}
         
-    def read_puts(self):
-        if self.last_read_time is not None:
-            try:
-                result = self.c.run(f"journalctl -u openstack-swift-object --since '{self.last_read_time}' | grep PUT", hide=True).stdout
-            except Exception:
-                return []
+    def follow(self, unit, stop):
+        # One long-lived `journalctl -f` per unit, (cursor, line) is yielded as the node writes entries until stop
+        # is set. JSON output carries each entry's cursor, the next follow resumes right after the last one seen
+        cursor = self.cursors.get(unit)
+        if self.local is not None:
+            yield from self.local.follow(unit, self.last_read_time, node=self.ip, after_cursor=cursor, stop=stop)
+            return
+        command = f"journalctl -o json -u {unit} -f"
+        if cursor is not None:
+            command += f" --after-cursor '{cursor}'"
+        elif self.last_read_time is not None:
+            command += f" --since '{self.last_read_time}'"
         else:
-            result = self.c.run(f"journalctl -u openstack-swift-object | grep PUT", hide=True).stdout
-        return [entry for entry in result.split("\n") if "PUT /sdb" in entry][:-self.reqs_in_last_ts or None]
-    
-    def read_gets(self):
-        if self.last_read_time is not None:
-            try:
-                result = self.c.run(f"journalctl -u openstack-swift-proxy --since '{self.last_read_time}' | grep GET", hide=True).stdout
-            except Exception:
-                return []
-        else:
-            result = self.c.run(f"journalctl -u openstack-swift-proxy | grep GET", hide=True).stdout
-        return [entry for entry in result.split("\n") if "GET /v1" in entry][:-self.reqs_in_last_ts or None]
-
+            command += " -n 0"
+        # A pty makes the remote journalctl exit when the channel is closed
+        _, stdout, _ = transport.exec_command(self.ip, command, get_pty=True)
+        closer = threading.Thread(target=lambda: (stop.wait(), stdout.channel.close()))
+        closer.daemon = True
+        closer.start()
+        try:
+            for text in stdout:
+                if stop.is_set():
+                    break
+                cursor, line = json_entry(text.strip())
+                if line is not None:
+                    yield cursor, line
+        finally:
+            stdout.channel.close()
             
-    def process_puts(self, put_requests, q):
-        for entry in put_requests:
-            request_array = entry.split()
-            ts = request_array[2]
-            object_url = request_array[11][:-1].split("/")[-1]
-            if not object_url.startswith("stock-data"):
+    def stream_puts(self, store, stop, seen, verbose=True, batch_size=64, flush_interval=0.5):
+        lock = threading.Lock()
+        done = threading.Event()
+        pending = [RecordBatch(self.ip)]
+        
+        def flush():
+            with lock:
+                batch, pending[0] = pending[0], RecordBatch(self.ip)
+            store.extend(batch)
+        
+        # Partial batches go out on a timer so live stats stay current while the log is quiet
+        def flusher():
+            while not done.wait(flush_interval):
+                flush()
+        
+        timer = threading.Thread(target=flusher)
+        timer.daemon = True
+        timer.start()
+        unit = "openstack-swift-object"
+        for cursor, line in self.follow(unit, stop):
+            if cursor is not None:
+                self.cursors[unit] = cursor
+            record = parse_line(line.strip())
+            if record is None or record.method != "PUT" or record.oid < 0 or record.ts < self.after:
                 continue
-            object_oid = int(re.split("[.-]", object_url)[2])
-            
-            # Object size
-            object_size = int(subprocess.check_output(["ls", "-l", f"container-data/{object_url}"], 
-                                                universal_newlines=True, 
-                                                timeout=3, 
-                                                stderr=subprocess.DEVNULL).strip().split()[4])
-            response_time = float(request_array[19])
-            
-            # Check TS
-            if ts == self.last_recorded_ts:
-                self.reqs_in_last_ts += 1
-            else:
-                self.reqs_in_last_ts = 1
-                self.last_recorded_ts = ts
-            
-            # Process/print the request
-            print(f"PUT Time: {ts}, Host: {self.ip}, Object: {object_oid}, Object Size: {object_size}, Time: {response_time}")
-            q.put(PutRequest(ts, object_oid, object_size, response_time))
+            object_size = self.sizes.get(record.path.split("/")[-1], record.bytes)
+            if verbose:
+                print(f"PUT Time: {clock(record.ts)}, Host: {self.ip}, Object: {record.oid}, Object Size: {object_size}, Time: {record.duration}")
+            with lock:
+                pending[0].append(record.ts, record.oid, object_size, record.duration)
+                full = len(pending[0]) >= batch_size
+            if full:
+                flush()
+            seen(self.ip, record.oid)
+        done.set()
+        timer.join()
+        flush()
         
-        if self.last_recorded_ts != "":
-            self.last_read_time = self.last_recorded_ts
-            
-    def process_gets(self):
-        pass
+    def set_since(self, t, after=0.0):
+        # Start over from a point in time, cursors take over after the first read.
+        # --since only has second resolution so records before `after` are dropped
+        self.last_read_time = t
+        self.after = after
+        self.cursors = {}
         
         
 class StorageNode:
-    def __init__(self, name, ip, weight, status):
+    def __init__(self, name, ip, weight, status, local=None, sizes=None):
         self.name = name
         self.ip = ip
         self.weight = weight
         self.status = status
-        self.lr = LogReader(self.ip)
+        self.local = local
+        self.lr = LogReader(self.ip, local=local, sizes=sizes)
         
     def startup(self):
         pass
@@ -655,19 +1091,20 @@ class StorageNode:
     
     def set_weight(self, weight):
         self.weight = weight
+        if self.local is not None:
+            return
         subprocess.run(["swift-ring-builder", "/etc/swift/object.builder", "set_weight", self.ip, weight])
         
 class StorageCluster:
-    def __init__(self):
+    def __init__(self, local=None):
         self.nodes = []
         self.last_read_time = None
-        self.q = Queue()
-        # VM Connections
-        self.cluster_c = {
-            "192.168.1.71": Connection(host="192.168.1.71", user="generic"),
-            "192.168.1.72": Connection(host="192.168.1.72", user="generic"),
-            "192.168.1.73": Connection(host="192.168.1.73", user="generic")
-        }
+        self.local = local
+        self.start_obj = 0
+        self.end_obj = 0
+        self.last_event_epoch = None
+        self.aggregator = None
+        self.pending = set()
         
     def add(self, node):
         self.nodes.append(node)
@@ -684,61 +1121,110 @@ class StorageCluster:
     
     def shut_down_node(self, ip):
         for node in self.nodes:
-            if node.ip == ip:
-                self.cluster_c[vm_mapping[ip]].sudo(f"virsh shutdown {node.name}")
+            if node.ip == ip and self.local is not None:
+                self.local.set_node_status(ip, False)
+                node.status = "shut off"
+            elif node.ip == ip:
+                transport.run(vm_mapping[ip], f"virsh shutdown {node.name}", user="generic", sudo=True)
                 
     def start_up_node(self, ip):
         for node in self.nodes:
-            if node.ip == ip:
-                self.cluster_c[vm_mapping[ip]].sudo(f"virsh start {node.name}")
+            if node.ip == ip and self.local is not None:
+                self.local.set_node_status(ip, True)
+                node.status = "running"
+            elif node.ip == ip:
+                transport.run(vm_mapping[ip], f"virsh start {node.name}", user="generic", sudo=True)
     
     def restart_stuff(self, num_nodes):
         pass
     
-    def set_event_time(self, t):
+    def set_event_time(self, t, after=0.0):
         self.last_read_time = t
+        self.last_event_epoch = after or datetime.strptime(t, "%Y-%m-%d %H:%M:%S").timestamp()
         for node in self.nodes:
-            node.lr.last_read_time = t
-            
-    def as_timestamp(self, ts):
-        dt = datetime.now()
-        time_array = ts.split(":")
-        return datetime(dt.year, dt.month, dt.day, int(time_array[0]), int(time_array[1]), int(time_array[2]))
+            node.lr.set_since(t, after)
             
-    def get_put_requests(self):
+    def get_put_requests(self, target_oids=None, replicas=1, deadline=60, live_interval=1.0, verbose=True, stop=None):
+        # Follow every node until each target oid is on enough nodes, the deadline passes or `stop` is set.
+        # `target_oids` can map oid -> PUTs expected for it, otherwise every oid needs `replicas`. Without
+        # targets it follows until the deadline or `stop`
+        stop = stop if stop is not None else threading.Event()
+        lock = threading.Lock()
+        required = target_oids if isinstance(target_oids, dict) else dict.fromkeys(target_oids or (), replicas)
+        pending = self.pending = set(required)
+        holders = {}
+        if target_oids is not None and not pending:
+            return
+        
+        def seen(ip, oid):
+            with lock:
+                if oid not in pending:
+                    return
+                holders.setdefault(oid, set()).add(ip)
+                if len(holders[oid]) >= required[oid]:
+                    pending.discard(oid)
+                    if not pending:
+                        stop.set()
+        
+        # Aggregation runs next to the readers instead of after them
+        self.aggregator = LiveAggregator(None, self.last_event_epoch).start()
         threads = []
         for node in self.nodes:
-            threads.append(threading.Thread(target=node.lr.read, args=("PUT", self.q)))
+            threads.append(threading.Thread(target=node.lr.stream_puts, args=(self.aggregator, stop, seen, verbose)))
+        start = time.time()
         for t in threads:
+            t.daemon = True
             t.start()
+        end = start + deadline
+        while not stop.is_set() and time.time() < end:
+            if not stop.wait(min(live_interval, max(0.0, end - time.time()))) and verbose:
+                print(self.live_stats())
+        stop.set()
         for t in threads:
-            t.join()
+            t.join(5)
+        error = self.aggregator.finish()
+        if error is not None:
+            print(f"Aggregation failed: {type(error).__name__}: {error}")
+        
+        if target_oids is not None:
+            print()
+            print(f"Status: {'COMPLETE' if not pending else f'INCOMPLETE ({len(pending)} objects short of their replicas)'}")
+            print(f"Collection Time: {round(time.time() - start, 3)} s")
             
-    def process_put_queue(self):
-        total_bytes = 0.0
-        total_requests = 0
-        total_response_time = 0.0
-        last_ts = None
-        while not self.q.empty():
-            req = self.q.get()
-            total_bytes += req.size
-            total_requests += 1
-            total_response_time += req.response_time
-            if last_ts is None or self.as_timestamp(req.ts) > self.as_timestamp(last_ts):
-                last_ts = req.ts
+    def live_stats(self):
+        if self.aggregator is None:
+            return "No collection running."
+        stats = self.aggregator.snapshot()
+        return (f"Live {round(stats['elapsed'], 1)} s: {stats['requests']} requests, {round(stats['bytes'] / 1024.0, 3)} KB, "
+                f"{round(stats['kbps'], 3)} KB/s, p50 {round(stats['p50'], 4)} s, p99 {round(stats['p99'], 4)} s, "
+                f"{len(self.pending)} objects pending, {stats['queued']} batches queued")
             
+    def finish_collection(self):
+        aggregator = self.aggregator
+        self.aggregator = None
+        return aggregator
+            
+    def process_put_queue(self):
+        # Everything was already folded in while collecting, only the report is left
+        aggregator = self.finish_collection()
+        
         # Calculate high level stats
-        if last_ts is not None:
-            end_time = self.as_timestamp(last_ts)
-            start_time = datetime.strptime(self.last_read_time, "%Y-%m-%d %H:%M:%S")
-            delta_sec = (end_time - start_time).total_seconds()
+        if aggregator is not None and aggregator.last_ts is not None:
+            start_time = aggregator.series.start
+            delta_sec = round(aggregator.last_ts - start_time, 3)
+            total_bytes = aggregator.bytes
+            series = aggregator.series
             
             # Metrics
-            print(f"Total Requests Made: {total_requests} requests")
+            print(f"Total Requests Made: {aggregator.requests} requests")
             print(f"Time Elapsed: {delta_sec} seconds")
             print(f"Total Data Size: {total_bytes / 1024.0} KB")
-            print(f"Speed: {round(total_bytes / 1024.0 / delta_sec, 3)} KB/s")
-            print(f"Average Response Time: {round(total_response_time / total_requests, 3)} s")
+            if delta_sec > 0:
+                print(f"Speed: {round(total_bytes / 1024.0 / delta_sec, 3)} KB/s")
+            print(f"Average Response Time: {round(aggregator.response_time / aggregator.requests, 3)} s")
+            print(f"Steady State Speed: {round(series.steady_state(), 3)} KB/s")
+            print(latency_table(aggregator.latencies))
+            return series
         else:
             print("Nothing to report about.")
             
@@ -749,13 +1235,23 @@ class StorageCluster:
                 node.set_weight(weight)
                 
     def rebalance(self):
+        if self.local is not None:
+            # In-process builder on the local ring, the local replicator does the data movement
+            builder = RingBuilder.from_ring(self.local.ring)
+            for node in self.nodes:
+                builder.set_weight(node.ip, float(node.weight))
+            builder.rebalance()
+            now = datetime.now()
+            self.set_event_time(now.strftime("%Y-%m-%d %H:%M:%S"), now.timestamp())
+            self.local.set_ring(builder.get_ring())
+            return
         subprocess.run(["swift-ring-builder", "/etc/swift/object.builder", "write_ring"])
         subprocess.run(["swift-ring-builder", "/etc/swift/object.builder", "rebalance"])
         subprocess.run(["systemctl", "restart", "openstack-swift-proxy.service"])
         self.set_event_time(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
         for ip in [node.ip for node in self.nodes]:
             try:
-                subprocess.run(["scp", "/etc/swift/object.ring.gz", f"root@{ip}:/etc/swift"], timeout=3)
+                transport.scp("/etc/swift/object.ring.gz", ip, "/etc/swift", timeout=3)
             except Exception:
                 pass
     
@@ -765,10 +1261,3 @@ class StorageCluster:
         for node in self.nodes:
             t.add_row([node.ip, node.weight, node.status])
         return str(t)
-                
-class PutRequest:
-    def __init__(self, ts, oid, size, response_time):
-        self.ts = ts
-        self.oid = oid
-        self.size = size
-        self.response_time = response_time
\ No newline at end of file
@@ -0,0 +1,245 @@
+import http.client
+import json
+import threading
+import time
+import calendar
+from queue import LifoQueue, Empty
+from urllib.parse import urlsplit, quote
+
+
+class SwiftHTTPError(Exception):
+    def __init__(self, method, path, status, reason):
+        super().__init__(f"{method} {path} failed: {status} {reason}")
+        self.status = status
+
+
+class ConnectionPool:
+    def __init__(self, url, maxsize=64, timeout=30):
+        parts = urlsplit(url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.timeout = timeout
+        self.pool = LifoQueue(maxsize=maxsize)
+        self.lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def new_connection(self):
+        with self.lock:
+            self.created += 1
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def get(self):
+        try:
+            conn = self.pool.get_nowait()
+            with self.lock:
+                self.reused += 1
+            return conn
+        except Empty:
+            return self.new_connection()
+
+    def put(self, conn):
+        try:
+            self.pool.put_nowait(conn)
+        except Exception:
+            conn.close()
+
+    def request(self, method, path, body=None, headers=None):
+        # A pooled connection may have been closed by the server while idle, so retry once on a fresh one
+        for attempt in range(2):
+            # The retry must not draw another idle connection, it could be just as stale
+            conn = self.get() if attempt == 0 else self.new_connection()
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                resp = conn.getresponse()
+                data = resp.read()
+            except (http.client.HTTPException, ConnectionError, OSError):
+                conn.close()
+                if attempt == 1:
+                    raise
+                continue
+            if resp.will_close:
+                conn.close()
+            else:
+                self.put(conn)
+            return resp.status, resp.reason, resp.headers, data
+
+    def close(self):
+        while True:
+            try:
+                self.pool.get_nowait().close()
+            except Empty:
+                break
+
+
+class SwiftHTTPClient:
+    def __init__(self, storage_url=None, token=None, auth_url=None, credentials=None,
+                 pool_size=64, timeout=30, token_margin=60):
+        self.storage_url = storage_url
+        self.token = token
+        self.token_expires = None
+        self.auth_url = auth_url
+        self.credentials = credentials
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.token_margin = token_margin
+        self.auth_lock = threading.Lock()
+        self.pools = {}
+        self.auth_count = 0
+
+    @classmethod
+    def from_keystone(cls, keystone, password, **kwargs):
+        credentials = {
+            "username": keystone.get("OS_USERNAME"),
+            "password": password,
+            "project_name": keystone.get("OS_PROJECT_NAME"),
+            "user_domain_name": keystone.get("OS_USER_DOMAIN_NAME"),
+            "project_domain_name": keystone.get("OS_PROJECT_DOMAIN_NAME")
+        }
+        return cls(auth_url=keystone.get("OS_AUTH_URL"), credentials=credentials, **kwargs)
+
+    def pool(self, url):
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        if key not in self.pools:
+            with self.auth_lock:
+                if key not in self.pools:
+                    self.pools[key] = ConnectionPool(url, maxsize=self.pool_size, timeout=self.timeout)
+        return self.pools[key]
+
+    def token_valid(self):
+        if self.token is None:
+            return False
+        if self.token_expires is None:
+            return True
+        return time.time() < self.token_expires - self.token_margin
+
+    def authenticate(self, force=False):
+        with self.auth_lock:
+            if not force and self.token_valid():
+                return
+            if self.auth_url is None:
+                if self.token is None:
+                    raise ValueError("No auth url or token configured")
+                return
+            body = {
+                "auth": {
+                    "identity": {
+                        "methods": ["password"],
+                        "password": {
+                            "user": {
+                                "name": self.credentials.get("username"),
+                                "domain": {"name": self.credentials.get("user_domain_name")},
+                                "password": self.credentials.get("password")
+                            }
+                        }
+                    },
+                    "scope": {
+                        "project": {
+                            "name": self.credentials.get("project_name"),
+                            "domain": {"name": self.credentials.get("project_domain_name")}
+                        }
+                    }
+                }
+            }
+            path = urlsplit(self.auth_url).path.rstrip("/") + "/auth/tokens"
+            status, reason, headers, data = ConnectionPool(self.auth_url, timeout=self.timeout).request(
+                "POST", path, body=json.dumps(body), headers={"Content-Type": "application/json"})
+            if status >= 300:
+                raise SwiftHTTPError("POST", path, status, reason)
+            token = json.loads(data).get("token")
+            self.token = headers.get("X-Subject-Token")
+            self.token_expires = calendar.timegm(time.strptime(token.get("expires_at")[:19], "%Y-%m-%dT%H:%M:%S"))
+            self.auth_count += 1
+            for service in token.get("catalog", []):
+                if service.get("type") == "object-store":
+                    for endpoint in service.get("endpoints"):
+                        if endpoint.get("interface") == "public":
+                            self.storage_url = endpoint.get("url")
+
+    def request(self, method, container=None, obj=None, body=None, headers=None, query=None):
+        self.authenticate()
+        path = urlsplit(self.storage_url).path.rstrip("/")
+        if container is not None:
+            path += "/" + quote(container)
+        if obj is not None:
+            path += "/" + quote(obj)
+        if query:
+            path += "?" + "&".join(f"{k}={quote(str(v))}" for k, v in query.items())
+        for attempt in range(2):
+            req_headers = {"X-Auth-Token": self.token}
+            req_headers.update(headers or {})
+            status, reason, resp_headers, data = self.pool(self.storage_url).request(method, path, body, req_headers)
+            # Token was revoked or expired early
+            if status == 401 and attempt == 0 and self.auth_url is not None:
+                self.authenticate(force=True)
+                continue
+            break
+        if status >= 300 and not (method == "GET" and status == 304):
+            raise SwiftHTTPError(method, path, status, reason)
+        return resp_headers, data
+
+    def put_container(self, container):
+        self.request("PUT", container)
+
+    def put_object(self, container, obj, contents, content_type="application/json"):
+        headers, _ = self.request("PUT", container, obj, body=contents, headers={"Content-Type": content_type})
+        return headers.get("Etag")
+
+    def get_object(self, container, obj):
+        headers, data = self.request("GET", container, obj)
+        return headers, data
+
+    def head_object(self, container, obj):
+        headers, _ = self.request("HEAD", container, obj)
+        return headers
+
+    def delete_object(self, container, obj):
+        self.request("DELETE", container, obj)
+
+    def list_objects(self, container, prefix=None, limit=10000):
+        # Page through the listing with markers
+        marker = None
+        while True:
+            query = {"format": "json", "limit": limit}
+            if prefix:
+                query["prefix"] = prefix
+            if marker:
+                query["marker"] = marker
+            _, data = self.request("GET", container, query=query)
+            entries = json.loads(data) if data else []
+            for entry in entries:
+                yield entry
+            if len(entries) < limit:
+                break
+            marker = entries[-1].get("name")
+
+    def get_container(self, container, marker=None, limit=None, prefix=None):
+        # Single listing page, same shape as python-swiftclient's get_container
+        query = {"format": "json"}
+        if marker:
+            query["marker"] = marker
+        if limit:
+            query["limit"] = limit
+        if prefix:
+            query["prefix"] = prefix
+        headers, data = self.request("GET", container, query=query)
+        return headers, json.loads(data) if data else []
+
+    def list_containers(self):
+        _, data = self.request("GET", query={"format": "json"})
+        return json.loads(data) if data else []
+
+    def stats(self):
+        return {
+            "auth": self.auth_count,
+            "created": sum(p.created for p in self.pools.values()),
+            "reused": sum(p.reused for p in self.pools.values())
+        }
+
+    def close(self):
+        for p in self.pools.values():
+            p.close()
@@ -1,5 +1,22 @@
 from swiftapi_v2 import SwiftClient
 
+flag_names = {"c": "concurrency", "r": "retries", "w": "workers", "d": "duration"}
+
+def parse_flags(args):
+    # Split "-c 64"-style options from positional arguments
+    positional = []
+    flags = {}
+    i = 0
+    while i < len(args):
+        if args[i].startswith("-") and i + 1 < len(args):
+            name = args[i].lstrip("-").replace("-", "_")
+            flags[flag_names.get(name, name)] = args[i + 1]
+            i += 2
+        else:
+            positional.append(args[i])
+            i += 1
+    return positional, flags
+
 # Initialization of client
 client = SwiftClient()
 
@@ -11,8 +28,14 @@ while True:
     # Command conditions
     if command == "datacount":
         client.datacount()
-    elif command == "dataloc":
-        client.dataloc()
+    elif command == "dataloc-scan":
+        client.dataloc_scan()
+    elif command.startswith("dataloc"):
+        client.dataloc(*[int(x) for x in command.split()[1:2]])
+    elif command.startswith("where"):
+        client.where(int(command.split()[1]))
+    elif command.startswith("node-objects"):
+        client.node_objects(command.split()[1], *[int(x) for x in command.split()[2:3]])
     elif command == "restart":
         client.restart_nodes()
     elif command == "build-ring":
@@ -24,7 +47,10 @@ while True:
     elif command == "force-clear-data":
         client.force_clear_data()
     elif command.startswith("add-data"):
-        client.add_data(int(command.split()[1]))
+        args, flags = parse_flags(command.split()[1:])
+        client.add_data(int(args[0]), *args[1:2], **{k: int(v) for k, v in flags.items()})
+    elif command.startswith("stream-data"):
+        client.stream_data(*[int(x) for x in command.split()[1:4]])
     elif command.startswith("generate-data"):
         client.add_data_container(int(command.split()[1]))
     elif command.startswith("set-weight"):
@@ -32,18 +58,43 @@ while True:
         client.set_weight(arr[1], arr[2])
     elif command == "data-movement":
         client.get_data_movement_stats_v2()
-    elif command == "movement":
-        client.get_movement()
+    elif command == "movement-status":
+        client.movement_status()
+    elif command.startswith("movement-bg"):
+        client.get_movement(*[float(x) for x in command.split()[1:2]], background=True)
+    elif command.startswith("movement"):
+        client.get_movement(*[float(x) for x in command.split()[1:2]])
+    elif command.startswith("throughput-export"):
+        client.export_throughput(command.split()[1])
+    elif command.startswith("throughput"):
+        client.show_throughput(*[float(x) for x in command.split()[1:2]])
     elif command == "data-movement-logs":
         client.get_data_movement_logs()
     elif command == "read-req":
         client.generate_read_req()
     elif command == "read-stats":
         client.get_read_req_stats()
+    elif command.startswith("read-load"):
+        args, flags = parse_flags(command.split()[1:])
+        client.read_load(workers=int(flags.get("workers", 8)), duration=float(flags.get("duration", 30)),
+                         dist=flags.get("dist", "uniform"), skew=float(flags.get("skew", 0.99)),
+                         max_oid=int(flags["max_oid"]) if "max_oid" in flags else None)
+    elif command.startswith("open-load"):
+        args, flags = parse_flags(command.split()[1:])
+        client.open_load(*args[:1], rate=float(flags.get("rate", 100)), duration=float(flags.get("duration", 30)),
+                         arrival=flags.get("arrival", "poisson"), workers=int(flags.get("workers", 64)),
+                         dist=flags.get("dist", "uniform"), skew=float(flags.get("skew", 0.99)),
+                         max_oid=int(flags["max_oid"]) if "max_oid" in flags else None)
+    elif command.startswith("workload"):
+        args, flags = parse_flags(command.split()[1:])
+        client.run_workload(args[0], workers=int(flags.get("workers", 8)), duration=float(flags.get("duration", 30)),
+                            skew=float(flags.get("skew", 0.99)),
+                            max_oid=int(flags["max_oid"]) if "max_oid" in flags else None)
     elif command == "reads":
         client.read_req_process()
-    elif command == "write-req":
-        client.generate_write_req()
+    elif command.startswith("write-req"):
+        args, flags = parse_flags(command.split()[1:])
+        client.generate_write_req(**{k: int(v) for k, v in flags.items()})
     elif command == "write-stats":
         client.get_write_req_stats()
     elif command == "shutdown":
@@ -60,12 +111,29 @@ while True:
         client.startup_nodes()
     elif command == "print-ring":
         client.print_cluster_info()
+    elif command.startswith("ramp"):
+        # ramp 192.168.1.99=50 192.168.1.98=150 --steps 4 --latency-limit 0.5 --settle 5 --step-timeout 300
+        args, flags = parse_flags(command.split()[1:])
+        client.ramp_weights({ip: float(weight) for ip, weight in (arg.split("=") for arg in args)},
+                            steps=int(flags.get("steps", 4)), latency_limit=float(flags.get("latency_limit", 0.5)),
+                            settle=float(flags.get("settle", 5)), step_timeout=float(flags.get("step_timeout", 300)),
+                            max_oid=int(flags["max_oid"]) if "max_oid" in flags else None)
+    elif command.startswith("simulate"):
+        # simulate weight 192.168.1.99 50; add 192.168.1.90 [@ kbps]
+        changes, _, kbps = command[len("simulate"):].partition("@")
+        client.simulate_rebalance(changes, *[float(x) for x in kbps.split()[:1]])
     elif command == "load-balance":
         client.rebalance()
     elif command == "lb-stats":
         client.get_load_balancing_stats()
     elif command == "lb-details":
         client.get_load_balancing_details()
+    elif command.startswith("local-cluster"):
+        client.use_local_cluster(*command.split()[1:2])
+    elif command.startswith("backend"):
+        client.set_backend(command.split()[1])
+    elif command == "transport":
+        print(client.transport)
     elif command == "test":
         client.test()
     elif command == "":
@@ -0,0 +1,101 @@
+import csv
+import json
+import numpy as np
+from prettytable import PrettyTable
+
+
+class ThroughputSeries:
+    def __init__(self, start, interval=0.1):
+        self.start = start
+        self.interval = interval
+        self.buckets = {}
+        self.nodes = set()
+
+    def record(self, ts, nbytes, node="cluster"):
+        index = max(0, int((ts - self.start) // self.interval))
+        bucket = self.buckets.get((index, node))
+        if bucket is None:
+            bucket = self.buckets[(index, node)] = [0, 0]
+            self.nodes.add(node)
+        bucket[0] += 1
+        bucket[1] += nbytes
+
+    def record_array(self, ts, nbytes, node="cluster"):
+        # Vectorized record for a column of timestamps and sizes from one node
+        index = np.maximum(0, np.floor_divide(np.asarray(ts, dtype=np.float64) - self.start, self.interval)).astype(np.int64)
+        if len(index) == 0:
+            return
+        requests = np.bincount(index)
+        sizes = np.bincount(index, weights=np.asarray(nbytes, dtype=np.float64))
+        self.nodes.add(node)
+        for i in np.nonzero(requests)[0].tolist():
+            bucket = self.buckets.setdefault((i, node), [0, 0])
+            bucket[0] += int(requests[i])
+            bucket[1] += int(sizes[i])
+
+    def rebin(self, interval):
+        # Coarser view, the interval is rounded to a multiple of the recorded one
+        factor = max(1, int(round(interval / self.interval)))
+        series = ThroughputSeries(self.start, self.interval * factor)
+        for (index, node), (requests, nbytes) in self.buckets.items():
+            bucket = series.buckets.setdefault((index // factor, node), [0, 0])
+            bucket[0] += requests
+            bucket[1] += nbytes
+        series.nodes = set(self.nodes)
+        return series
+
+    def length(self):
+        return max(index for index, _ in self.buckets) + 1 if self.buckets else 0
+
+    def rows(self):
+        # Every interval up to the last request, empty ones included so stalls show up
+        for index in range(self.length()):
+            for node in sorted(self.nodes):
+                requests, nbytes = self.buckets.get((index, node), (0, 0))
+                yield [round(index * self.interval, 3), node, requests, nbytes,
+                       round(nbytes / 1024.0 / self.interval, 3)]
+
+    def totals(self):
+        totals = [[0, 0] for _ in range(self.length())]
+        for (index, _), (requests, nbytes) in self.buckets.items():
+            totals[index][0] += requests
+            totals[index][1] += nbytes
+        return totals
+
+    def steady_state(self, trim=0.1):
+        # KB/s over the middle of the active period, ramp-up and tail intervals trimmed off
+        totals = [nbytes for _, nbytes in self.totals()]
+        active = [i for i, nbytes in enumerate(totals) if nbytes > 0]
+        if not active:
+            return 0.0
+        window = totals[active[0]:active[-1] + 1]
+        k = int(len(window) * trim)
+        middle = window[k:len(window) - k] or window
+        return sum(middle) / 1024.0 / (len(middle) * self.interval)
+
+    def to_csv(self, fp):
+        with open(fp, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["offset", "node", "requests", "bytes", "kbps"])
+            writer.writerows(self.rows())
+
+    def to_json(self, fp):
+        with open(fp, "w") as f:
+            json.dump({
+                "start": self.start,
+                "interval": self.interval,
+                "steady_state_kbps": round(self.steady_state(), 3),
+                "series": [dict(zip(["offset", "node", "requests", "bytes", "kbps"], row)) for row in self.rows()]
+            }, f, indent=4)
+
+    def table(self, width=40):
+        nodes = sorted(self.nodes)
+        totals = self.totals()
+        peak = max([nbytes for _, nbytes in totals] + [1])
+        t = PrettyTable(["Time (s)"] + [f"{node} KB/s" for node in nodes] + ["Requests", "Total KB/s", ""])
+        t.align[""] = "l"
+        for index, (requests, nbytes) in enumerate(totals):
+            per_node = [round(self.buckets.get((index, node), (0, 0))[1] / 1024.0 / self.interval, 3) for node in nodes]
+            t.add_row([round(index * self.interval, 3)] + per_node +
+                      [requests, round(nbytes / 1024.0 / self.interval, 3), "#" * int(width * nbytes / peak)])
+        return t
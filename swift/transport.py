@@ -0,0 +1,132 @@
+import os
+import socket
+import subprocess
+import threading
+from fabric import Connection
+from paramiko.ssh_exception import SSHException
+from prettytable import PrettyTable
+
+# OpenSSH multiplexing for the ssh/scp processes (stats.sh, ring pushes): the first call to a host
+# starts a master connection and later ones ride on it until it has been idle for ControlPersist seconds
+control_dir = os.environ.get("SWIFT_SSH_CONTROL_DIR", "/tmp/swift-ssh")
+control_persist = 600
+
+
+def ssh_options():
+    return ["-o", "ControlMaster=auto", "-o", f"ControlPath={control_dir}/%r@%h:%p",
+            "-o", f"ControlPersist={control_persist}"]
+
+
+class HostCounter:
+    def __init__(self):
+        self.opened = 0
+        self.reused = 0
+        self.reconnects = 0
+        self.commands = 0
+
+
+class Transport:
+    # One persistent session per user@host shared by everything that talks to the nodes.
+    # Fabric connections are opened on first use and reopened once if the session has dropped
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections = {}
+        self.counters = {}
+
+    def counter(self, user, host):
+        with self.lock:
+            return self.counters.setdefault((user, host), HostCounter())
+
+    def connection(self, host, user="root", connect_kwargs=None):
+        key = (user, host)
+        with self.lock:
+            conn = self.connections.get(key)
+            if conn is None:
+                conn = self.connections[key] = Connection(host=host, user=user, connect_kwargs=connect_kwargs or {})
+        return conn
+
+    def checkout(self, host, user):
+        conn = self.connection(host, user)
+        counter = self.counter(user, host)
+        if conn.is_connected:
+            counter.reused += 1
+        else:
+            counter.opened += 1
+        counter.commands += 1
+        return conn, counter
+
+    def connect(self, host, user):
+        # Only opening the session is retried: once a command has been sent it may have run on the host,
+        # and restart scripts, virsh and rm must not run twice
+        conn, counter = self.checkout(host, user)
+        for attempt in range(2):
+            try:
+                conn.open()
+                return conn
+            except (SSHException, EOFError, socket.error):
+                # Stale session, drop it and reconnect once
+                conn.close()
+                if attempt == 1:
+                    raise
+                counter.reconnects += 1
+
+    def run(self, host, command, user="root", sudo=False, **kwargs):
+        conn = self.connect(host, user)
+        try:
+            return (conn.sudo if sudo else conn.run)(command, **kwargs)
+        except (SSHException, EOFError, socket.error):
+            # The next call opens a fresh session
+            conn.close()
+            raise
+
+    def exec_command(self, host, command, user="root", get_pty=False):
+        # Raw channel on the shared session, for long-running streams like `journalctl -f`
+        conn = self.connect(host, user)
+        try:
+            return conn.client.exec_command(command, get_pty=get_pty)
+        except (SSHException, EOFError, socket.error):
+            conn.close()
+            raise
+
+    def note_cli(self, host, user="root"):
+        # The control socket exists while a master connection is alive, so its presence means reuse
+        os.makedirs(control_dir, exist_ok=True)
+        counter = self.counter(f"{user} (ssh)", host)
+        if os.path.exists(os.path.join(control_dir, f"{user}@{host}:22")):
+            counter.reused += 1
+        else:
+            counter.opened += 1
+        counter.commands += 1
+
+    def env(self):
+        env = dict(os.environ)
+        env["SSH_OPTS"] = " ".join(ssh_options())
+        return env
+
+    def script(self, args, host, user="root", timeout=None):
+        # stats.sh style helper scripts, sharing the multiplexed ssh sessions
+        self.note_cli(host, user)
+        return subprocess.check_output(args, universal_newlines=True, timeout=timeout,
+                                       stderr=subprocess.DEVNULL, env=self.env()).strip()
+
+    def scp(self, src, host, dst, user="root", timeout=None):
+        # `src` can be a list, every file goes in the one scp
+        self.note_cli(host, user)
+        sources = [src] if isinstance(src, str) else list(src)
+        return subprocess.run(["scp"] + ssh_options() + sources + [f"{user}@{host}:{dst}"], timeout=timeout)
+
+    def close(self):
+        with self.lock:
+            connections = list(self.connections.values())
+        for conn in connections:
+            conn.close()
+
+    def __repr__(self):
+        t = PrettyTable(["Host", "User", "Opened", "Reused", "Reconnects", "Commands"])
+        with self.lock:
+            for (user, host), counter in sorted(self.counters.items()):
+                t.add_row([host, user, counter.opened, counter.reused, counter.reconnects, counter.commands])
+        return str(t)
+
+
+transport = Transport()
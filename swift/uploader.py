@@ -0,0 +1,73 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from prettytable import PrettyTable
+from histogram import ThreadHistograms, latency_columns
+
+
+class UploadResult:
+    def __init__(self, name, size, latency, total_time, attempts, ok):
+        self.name = name
+        self.size = size
+        self.latency = latency
+        self.total_time = total_time
+        self.attempts = attempts
+        self.ok = ok
+
+
+class UploadEngine:
+    def __init__(self, conn_factory, container, concurrency=16, retries=0, backoff=0.1):
+        self.conn_factory = conn_factory
+        self.container = container
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.local = threading.local()
+        self.latencies = ThreadHistograms()
+        self.results = []
+        self.elapsed = 0.0
+
+    def connection(self):
+        # One connection per worker thread
+        if not hasattr(self.local, "conn"):
+            self.local.conn = self.conn_factory()
+        return self.local.conn
+
+    def upload_one(self, name, path):
+        # Read inside the try so an unreadable file is a failed upload instead of an exception out of run()
+        payload = None
+        start = time.time()
+        for attempt in range(1, self.retries + 2):
+            attempt_start = time.time()
+            try:
+                if payload is None:
+                    with open(path, "rb") as f:
+                        payload = f.read()
+                self.connection().put_object(self.container, name, payload)
+                end = time.time()
+                self.latencies.record(end - attempt_start)
+                return UploadResult(name, len(payload), end - attempt_start, end - start, attempt, True)
+            except Exception:
+                if attempt <= self.retries:
+                    time.sleep(self.backoff * 2 ** (attempt - 1))
+        end = time.time()
+        return UploadResult(name, len(payload) if payload is not None else 0, end - attempt_start, end - start,
+                            attempt, False)
+
+    def run(self, items):
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            self.results = list(executor.map(lambda item: self.upload_one(*item), items))
+        self.elapsed = time.time() - start
+        return self.results
+
+    def __repr__(self):
+        ok = [r for r in self.results if r.ok]
+        total_bytes = sum(r.size for r in ok)
+        elapsed = self.elapsed if self.elapsed > 0 else float("inf")
+        t = PrettyTable(["Objects", "Failed", "Retries", "Concurrency", "Elapsed (s)", "Objects/s", "KB/s"] +
+                        latency_columns)
+        t.add_row([len(ok), len(self.results) - len(ok), sum(r.attempts - 1 for r in self.results),
+                   self.concurrency, round(self.elapsed, 3), round(len(ok) / elapsed, 1),
+                   round(total_bytes / 1024.0 / elapsed, 3)] + self.latencies.merged().row())
+        return str(t)